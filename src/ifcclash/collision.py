@@ -4,6 +4,7 @@
 import numpy as np
 
 import collections
+import itertools
 
 try:
     # pip install python-fcl
@@ -146,14 +147,17 @@ class CollisionManager(object):
         # {id(bvh) : str, name}
         # unpopulated values will return None
         self._names = collections.defaultdict(lambda: None)
+        # names of objects that share a BVH, by their transform
+        # {id(bvh) : {transform key: [str, name]}}
+        self._shared_names = {}
 
         # cache BVH objects
-        # {mesh.md5(): fcl.BVHModel object}
+        # {mesh key: fcl.BVHModel object}
         self._bvh = {}
         self._manager = fcl.DynamicAABBTreeCollisionManager()
         self._manager.setup()
 
-    def add_object(self, name, mesh, transform=None):
+    def add_object(self, name, mesh, transform=None, key=None):
         """
         Add an object to the collision manager.
 
@@ -168,8 +172,42 @@ class CollisionManager(object):
           The geometry of the collision object
         transform : (4,4) float
           Homogeneous transform matrix for the object
+        key : hashable
+          An identifier for the mesh, such as a representation id.
+          Objects with the same key share a single BVH.
         """
+        o = self._create_object(name, mesh, transform, key)
+        self._manager.registerObject(o)
+        self._manager.update()
+        return o
+
+    def add_objects(self, objects):
+        """
+        Add many objects to the collision manager at once.
+
+        The objects are registered together and the tree is only
+        built once, rather than updated for every object.
+
+        Parameters
+        ----------
+        objects : iterable of (name, mesh, transform, key)
+          The arguments of add_object for every object
 
+        Returns
+        -------
+        objects : list of fcl.CollisionObject
+          The collision objects in the order of the input
+        """
+        collision_objects = [self._create_object(*args) for args in objects]
+        self._manager.registerObjects(collision_objects)
+        self._manager.update()
+        return collision_objects
+
+    def _create_object(self, name, mesh, transform=None, key=None):
+        """
+        Create a collision object and store its name, without
+        registering it in the tree.
+        """
         # if no transform passed, assume identity transform
         if transform is None:
             transform = np.eye(4)
@@ -178,20 +216,22 @@ class CollisionManager(object):
             raise ValueError("transform must be (4,4)!")
 
         # create or recall from cache BVH
-        bvh = self._get_BVH(mesh)
+        bvh = self._get_BVH(mesh, key)
         # create the FCL transform from (4,4) matrix
         t = fcl.Transform(transform[:3, :3], transform[:3, 3])
         o = fcl.CollisionObject(bvh, t)
 
         # Add collision object to set
         if name in self._objs:
-            self._manager.unregisterObject(self._objs[name])
+            self._manager.unregisterObject(self._objs[name]["obj"])
+            self._forget_name(name, self._objs[name])
         self._objs[name] = {"obj": o, "geom": bvh}
         # store the name of the geometry
         self._names[id(bvh)] = name
+        if key is not None:
+            # contacts only refer to the geometry, so objects that share it are grouped by their transform
+            self._shared_names.setdefault(id(bvh), {}).setdefault(self._transform_key(o), []).append(name)
 
-        self._manager.registerObject(o)
-        self._manager.update()
         return o
 
     def remove_object(self, name):
@@ -206,10 +246,8 @@ class CollisionManager(object):
         if name in self._objs:
             self._manager.unregisterObject(self._objs[name]["obj"])
             self._manager.update(self._objs[name]["obj"])
-            # remove objects from _objs
-            geom_id = id(self._objs.pop(name)["geom"])
-            # remove names
-            self._names.pop(geom_id)
+            # remove objects from _objs and their names
+            self._forget_name(name, self._objs.pop(name))
         else:
             raise ValueError("{} not in collision manager!".format(name))
 
@@ -227,8 +265,15 @@ class CollisionManager(object):
         """
         if name in self._objs:
             o = self._objs[name]["obj"]
+            is_shared = id(self._objs[name]["geom"]) in self._shared_names
+            if is_shared:
+                self._forget_name(name, self._objs[name])
             o.setRotation(transform[:3, :3])
             o.setTranslation(transform[:3, 3])
+            if is_shared:
+                self._names[id(self._objs[name]["geom"])] = name
+                shared_names = self._shared_names.setdefault(id(self._objs[name]["geom"]), {})
+                shared_names.setdefault(self._transform_key(o), []).append(name)
             self._manager.update(o)
         else:
             raise ValueError("{} not in collision manager!".format(name))
@@ -273,18 +318,25 @@ class CollisionManager(object):
         if return_names or return_data:
             cdata = fcl.CollisionData(request=fcl.CollisionRequest(num_max_contacts=100000, enable_contact=True))
 
-        self._manager.collide(o, cdata, fcl.defaultCollisionCallback)
+        self._manager.collide(o, cdata, self._collision_callback)
         result = cdata.result.is_collision
 
         # If we want to return the objects that were collision, collect them.
         objs_in_collision = set()
         contact_data = []
         if return_names or return_data:
+            calls = {}
+            counts = collections.Counter()
             for contact in cdata.result.contacts:
-                cg = contact.o1
+                cg, co = contact.o1, contact.objects[0]
                 if cg == b:
-                    cg = contact.o2
-                name = self._extract_name(cg)
+                    cg, co = contact.o2, contact.objects[1]
+                if contact.call not in calls:
+                    # the n-th collided object of a group of objects that share a BVH and transform is its n-th name
+                    names = self._extract_names(cg, co)
+                    calls[contact.call] = names[counts[tuple(names)] % len(names)] if names else None
+                    counts[tuple(names)] += 1
+                name = calls[contact.call]
 
                 names = (name, "__external")
                 if cg == contact.o2:
@@ -332,16 +384,14 @@ class CollisionManager(object):
         if return_names or return_data:
             cdata = fcl.CollisionData(request=fcl.CollisionRequest(num_max_contacts=1000000, enable_contact=True))
 
-        self._manager.collide(cdata, fcl.defaultCollisionCallback)
+        self._manager.collide(cdata, self._collision_callback)
 
         result = cdata.result.is_collision
 
         objs_in_collision = set()
         contact_data = []
         if return_names or return_data:
-            for contact in cdata.result.contacts:
-                names = (self._extract_name(contact.o1), self._extract_name(contact.o2))
-
+            for contact, names, reverse in self._contact_names(cdata.result.contacts, self):
                 if return_names:
                     objs_in_collision.add(tuple(sorted(names)))
                 if return_data:
@@ -387,19 +437,13 @@ class CollisionManager(object):
         cdata = fcl.CollisionData()
         if return_names or return_data:
             cdata = fcl.CollisionData(request=fcl.CollisionRequest(num_max_contacts=100000, enable_contact=True))
-        self._manager.collide(other_manager._manager, cdata, fcl.defaultCollisionCallback)
+        self._manager.collide(other_manager._manager, cdata, self._collision_callback)
         result = cdata.result.is_collision
 
         objs_in_collision = set()
         contact_data = []
         if return_names or return_data:
-            for contact in cdata.result.contacts:
-                reverse = False
-                names = (self._extract_name(contact.o1), other_manager._extract_name(contact.o2))
-                if names[0] is None:
-                    names = (self._extract_name(contact.o2), other_manager._extract_name(contact.o1))
-                    reverse = True
-
+            for contact, names, reverse in self._contact_names(cdata.result.contacts, other_manager):
                 if return_names:
                     objs_in_collision.add(names)
                 if return_data:
@@ -455,18 +499,18 @@ class CollisionManager(object):
         if return_data:
             ddata = fcl.DistanceData(fcl.DistanceRequest(enable_nearest_points=True), fcl.DistanceResult())
 
-        self._manager.distance(o, ddata, fcl.defaultDistanceCallback)
+        self._manager.distance(o, ddata, self._distance_callback)
 
         distance = ddata.result.min_distance
 
         # If we want to return the objects that were collision, collect them.
         name, data = None, None
         if return_name or return_data:
-            cg = ddata.result.o1
+            cg, co = ddata.result.o1, ddata.objects[0]
             if cg == b:
-                cg = ddata.result.o2
+                cg, co = ddata.result.o2, ddata.objects[1]
 
-            name = self._extract_name(cg)
+            name = self._extract_name(cg, co)
 
             names = (name, "__external")
             if cg == ddata.result.o2:
@@ -507,13 +551,20 @@ class CollisionManager(object):
         if return_data:
             ddata = fcl.DistanceData(fcl.DistanceRequest(enable_nearest_points=True), fcl.DistanceResult())
 
-        self._manager.distance(ddata, fcl.defaultDistanceCallback)
+        self._manager.distance(ddata, self._distance_callback)
 
         distance = ddata.result.min_distance
 
         names, data = None, None
         if return_names or return_data:
-            names = (self._extract_name(ddata.result.o1), self._extract_name(ddata.result.o2))
+            groups = (
+                self._extract_names(ddata.result.o1, ddata.objects[0]),
+                self._extract_names(ddata.result.o2, ddata.objects[1]),
+            )
+            names = tuple(g[0] if g else None for g in groups)
+            if groups[0] == groups[1] and len(groups[0]) > 1:
+                # the closest objects share a BVH and a transform
+                names = tuple(groups[0][:2])
             data = DistanceData(names, ddata.result)
             names = tuple(sorted(names))
 
@@ -557,17 +608,18 @@ class CollisionManager(object):
         if return_data:
             ddata = fcl.DistanceData(fcl.DistanceRequest(enable_nearest_points=True), fcl.DistanceResult())
 
-        self._manager.distance(other_manager._manager, ddata, fcl.defaultDistanceCallback)
+        self._manager.distance(other_manager._manager, ddata, self._distance_callback)
 
         distance = ddata.result.min_distance
 
         names, data = None, None
         if return_names or return_data:
+            o1, o2 = ddata.objects
             reverse = False
-            names = (self._extract_name(ddata.result.o1), other_manager._extract_name(ddata.result.o2))
+            names = (self._extract_name(ddata.result.o1, o1), other_manager._extract_name(ddata.result.o2, o2))
             if names[0] is None:
                 reverse = True
-                names = (self._extract_name(ddata.result.o2), other_manager._extract_name(ddata.result.o1))
+                names = (self._extract_name(ddata.result.o2, o2), other_manager._extract_name(ddata.result.o1, o1))
 
             dnames = tuple(names)
             if reverse:
@@ -583,7 +635,7 @@ class CollisionManager(object):
         else:
             return distance
 
-    def _get_BVH(self, mesh):
+    def _get_BVH(self, mesh, key=None):
         """
         Get a BVH for a mesh.
 
@@ -591,16 +643,98 @@ class CollisionManager(object):
         -------------
         mesh : Trimesh
           Mesh to create BVH for
+        key : hashable
+          If not None, the BVH is cached under this key and
+          returned for later meshes with the same key
 
         Returns
         --------------
         bvh : fcl.BVHModel
           BVH object of source mesh
         """
-        bvh = mesh_to_BVH(mesh)
+        if key is None:
+            return mesh_to_BVH(mesh)
+        bvh = self._bvh.get(key)
+        if bvh is None:
+            bvh = self._bvh[key] = mesh_to_BVH(mesh)
         return bvh
 
-    def _extract_name(self, geom):
+    def _contact_names(self, contacts, other_manager):
+        """
+        Yield every contact with the names of its objects.
+
+        Objects that share a BVH and a transform can't be told apart
+        by a contact, but every pair of objects is collided once. The
+        n-th collided pair of two such groups of objects is therefore
+        given the n-th pair of their names.
+
+        Parameters
+        ------------
+        contacts : list of fcl.Contact
+          Contacts found by _collision_callback
+        other_manager : CollisionManager
+          The manager that was collided with, or self
+
+        Yields
+        ------------
+        contact : fcl.Contact
+          A contact
+        names : 2-tup
+          The names of the objects of this manager and other_manager
+        reverse : bool
+          If the objects are in the reverse order of the contact
+        """
+        calls = {}
+        counts = collections.Counter()
+        for contact in contacts:
+            if contact.call not in calls:
+                o1, o2 = contact.objects
+                reverse = False
+                groups = (self._extract_names(contact.o1, o1), other_manager._extract_names(contact.o2, o2))
+                if not groups[0] and other_manager is not self:
+                    groups = (self._extract_names(contact.o2, o2), other_manager._extract_names(contact.o1, o1))
+                    reverse = True
+                key = tuple(map(tuple, groups))
+                is_swapped = other_manager is self and key[0] > key[1]
+                if is_swapped:
+                    key = key[::-1]
+                if other_manager is self and key[0] == key[1]:
+                    pairs = list(itertools.combinations(key[0], 2))
+                else:
+                    pairs = list(itertools.product(*key))
+                names = pairs[counts[key] % len(pairs)] if pairs else tuple(g[0] if g else None for g in groups)
+                counts[key] += 1
+                if is_swapped:
+                    names = names[::-1]
+                calls[contact.call] = (names, reverse)
+            names, reverse = calls[contact.call]
+            yield contact, names, reverse
+
+    def _extract_names(self, geom, obj=None):
+        """
+        Retrieve the names of the objects from the manager that have
+        the geometry and the transform of a CollisionObject.
+
+        Parameters
+        -----------
+        geom : CollisionObject or BVHModel
+          Input model
+        obj : CollisionObject
+          The object of the geometry, which tells apart objects
+          that share a BVH but not their transform
+
+        Returns
+        ------------
+        names : list of hashable
+          Names of the objects, empty if not found
+        """
+        shared_names = self._shared_names.get(id(geom))
+        if shared_names is not None and obj is not None:
+            return list(shared_names.get(self._transform_key(obj), []))
+        name = self._names[id(geom)]
+        return [] if name is None else [name]
+
+    def _extract_name(self, geom, obj=None):
         """
         Retrieve the name of an object from the manager by its
         CollisionObject, or return None if not found.
@@ -609,13 +743,92 @@ class CollisionManager(object):
         -----------
         geom : CollisionObject or BVHModel
           Input model
+        obj : CollisionObject
+          The object of the geometry, which tells apart objects
+          that share a BVH
 
         Returns
         ------------
         names : hashable
           Name of input geometry
         """
-        return self._names[id(geom)]
+        names = self._extract_names(geom, obj)
+        return names[0] if names else None
+
+    def _forget_name(self, name, obj):
+        """
+        Remove the name of an entry of _objs.
+        """
+        geom_id = id(obj["geom"])
+        shared_names = self._shared_names.get(geom_id)
+        if shared_names is not None:
+            transform_key = self._transform_key(obj["obj"])
+            names = shared_names.get(transform_key, [])
+            if name in names:
+                names.remove(name)
+            if not names:
+                shared_names.pop(transform_key, None)
+            if shared_names:
+                # the fallback name of the geometry must remain one of its objects
+                if self._names.get(geom_id) == name:
+                    self._names[geom_id] = next(iter(shared_names.values()))[0]
+                return
+            del self._shared_names[geom_id]
+        self._names.pop(geom_id, None)
+
+    @staticmethod
+    def _transform_key(obj):
+        return tuple(obj.getTranslation()) + tuple(obj.getRotation().flatten())
+
+    @staticmethod
+    def _collision_callback(o1, o2, cdata):
+        """
+        Like fcl.defaultCollisionCallback, but also stores the
+        objects of every contact, as contact.objects, and the number
+        of the pair of objects, as contact.call. The contacts only
+        refer to the geometry, which objects can share.
+        """
+        request = cdata.request
+        result = cdata.result
+
+        if cdata.done:
+            return True
+
+        cdata.calls = getattr(cdata, "calls", 0) + 1
+        num_contacts = len(result.contacts)
+        fcl.collide(o1, o2, request, result)
+        for contact in result.contacts[num_contacts:]:
+            contact.objects = (o1, o2)
+            contact.call = cdata.calls
+
+        if not request.enable_cost and result.is_collision and len(result.contacts) > request.num_max_contacts:
+            cdata.done = True
+
+        return cdata.done
+
+    @staticmethod
+    def _distance_callback(o1, o2, ddata):
+        """
+        Like fcl.defaultDistanceCallback, but also stores the
+        objects of the closest pair as ddata.objects.
+        """
+        request = ddata.request
+        result = ddata.result
+
+        if ddata.done:
+            return True, result.min_distance
+
+        min_distance = result.min_distance
+        fcl.distance(o1, o2, request, result)
+        if result.min_distance < min_distance or not hasattr(ddata, "objects"):
+            ddata.objects = (o1, o2)
+
+        dist = result.min_distance
+
+        if dist <= 0:
+            return True, dist
+
+        return ddata.done, dist
 
 
 def mesh_to_BVH(mesh):
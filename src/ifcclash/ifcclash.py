@@ -10,6 +10,12 @@ import json
 import sys
 import argparse
 import logging
+import itertools
+import collections
+import hashlib
+import pickle
+import os
+import re
 
 
 class Mesh:
@@ -23,117 +29,330 @@ class IfcClasher:
         self.geom_settings = ifcopenshell.geom.settings()
         self.clash_sets = []
         self.clash_data = {"meshes": {}}
-        self.global_data = {"meshes": {}, "matrices": {}}
+        self.global_data = {"meshes": {}, "matrices": {}, "fingerprints": {}}
+        self.cache = None
+        self.instance_hashes = {}
 
     def clash(self):
+        self.cache = self.load_cache()
         for clash_set in self.clash_sets:
             self.process_clash_set(clash_set)
+        self.save_cache()
+
+    def load_cache(self):
+        """Loads the clash cache of the settings, which holds the meshes and clashes of the previous run
+
+        The cache holds, for every file, the fingerprint, mesh and placement
+        matrix of every element by GlobalId, and for every clash set the
+        fingerprints of its elements and its clashes.
+        """
+        path = getattr(self.settings, "cache", None)
+        if not path:
+            return None
+        cache = None
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as cache_file:
+                    cache = pickle.load(cache_file)
+            except Exception:
+                self.settings.logger.info(f"Unable to read clash cache {path}, clashing from scratch")
+        if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+            cache = {"version": CACHE_VERSION, "files": {}, "clash_sets": {}}
+        # Entries of elements that are not part of this run are not saved again
+        cache["used"] = collections.defaultdict(set)
+        return cache
+
+    def save_cache(self):
+        if self.cache is None:
+            return
+        used = self.cache.pop("used")
+        for filename, elements in self.cache["files"].items():
+            self.cache["files"][filename] = {k: v for k, v in elements.items() if k in used[filename]}
+        names = {clash_set["name"] for clash_set in self.clash_sets}
+        self.cache["clash_sets"] = {k: v for k, v in self.cache["clash_sets"].items() if k in names}
+        path = self.settings.cache
+        with open(path + ".tmp", "wb") as cache_file:
+            pickle.dump(self.cache, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
 
     def process_clash_set(self, clash_set):
+        tile_size = getattr(self.settings, "tile_size", 0)
+        previous = self.get_previous_clash_set(clash_set)
+        objects = {}
+        elements = {}
         for ab in ["a", "b"]:
             self.settings.logger.info(f"Creating collision manager {ab} ...")
             clash_set[f"{ab}_cm"] = collision.CollisionManager()
             self.settings.logger.info(f"Loading files {ab} ...")
+            objects[ab] = []
+            elements[ab] = {}
             for data in clash_set[ab]:
                 data["ifc"] = ifcopenshell.open(data["file"])
                 self.patch_ifc(data["ifc"])
+                self.add_elements(elements[ab], data["ifc"])
                 self.settings.logger.info(f"Creating collision data for {ab} ...")
                 if len(data["ifc"].by_type("IfcElement")) > 0:
-                    self.add_collision_objects(data, clash_set[f"{ab}_cm"])
+                    # When tiling, collision objects are only created in the worker processes
+                    cm = None if tile_size or previous else clash_set[f"{ab}_cm"]
+                    objects[ab].extend(self.add_collision_objects(data, cm) or [])
+
+        tolerance = clash_set["tolerance"] if "tolerance" in clash_set else 0.01
+        is_internal = not ("b" in clash_set and clash_set["b"])
 
-        if "b" in clash_set and clash_set["b"]:
-            results = clash_set["a_cm"].in_collision_other(clash_set["b_cm"], return_data=True)
+        if previous:
+            clashes = self.get_incremental_clashes(previous, objects, is_internal, tolerance)
+        elif tile_size:
+            clashes = self.get_tiled_clashes(objects["a"], None if is_internal else objects["b"], tolerance, tile_size)
         else:
-            results = clash_set["a_cm"].in_collision_internal(return_data=True)
+            if is_internal:
+                results = clash_set["a_cm"].in_collision_internal(return_data=True)
+            else:
+                results = clash_set["a_cm"].in_collision_other(clash_set["b_cm"], return_data=True)
+            clashes = self.get_clashes(results[1], tolerance, self.global_data["meshes"], self.global_data["matrices"])
+
+        if self.cache is not None:
+            fingerprints = self.global_data["fingerprints"]
+            self.cache["clash_sets"][clash_set["name"]] = {
+                "signature": self.get_clash_set_signature(clash_set),
+                "fingerprints": {ab: {o[0]: fingerprints[o[0]] for o in objects[ab]} for ab in ["a", "b"]},
+                "clashes": clashes,
+            }
 
-        if not results[0]:
+        if not clashes:
             return
 
-        tolerance = clash_set["tolerance"] if "tolerance" in clash_set else 0.01
         clash_set["clashes"] = {}
+        for key, clash in sorted(clashes.items()):
+            a = self.get_element(elements["a"], clash["a_global_id"])
+            b = self.get_element(elements["a" if is_internal else "b"], clash["b_global_id"])
+            clash_set["clashes"][key] = {
+                "a_global_id": clash["a_global_id"],
+                "b_global_id": clash["b_global_id"],
+                "a_ifc_class": a.is_a(),
+                "b_ifc_class": b.is_a(),
+                "a_name": a.Name,
+                "b_name": b.Name,
+                "normal": clash["normal"],
+                "position": clash["position"],
+                "penetration_depth": clash["penetration_depth"],
+            }
 
-        for contact in results[1]:
-            a_global_id, b_global_id = contact.names
-            a = self.get_element(clash_set["a"], a_global_id)
-            if "b" in clash_set and clash_set["b"]:
-                b = self.get_element(clash_set["b"], b_global_id)
-            else:
-                b = self.get_element(clash_set["a"], b_global_id)
-            if contact.raw.penetration_depth < tolerance:
-                continue
-
-            # fcl returns contact data for faces that aren't actually
-            # penetrating, but just touching. If our tolerance is zero, then we
-            # consider these as clashes and we move on. If our tolerance is not
-            # zero, fcl has a strange behaviour where the penetration depth can
-            # be a large number even though objects are just touching
-            # https://github.com/flexible-collision-library/fcl/issues/503 In
-            # this case, I don't trust the penetration depth and I run my own
-            # triangle-triangle intersection test. Optimistically, this skips
-            # the false positives. Conservatively, we let the user manually deal
-            # with the false positives and we mark it as a clash.
-            is_optimistic = True  # TODO: let user configure this
-
-            if is_optimistic and tolerance != 0:
-                # We'll now check if the contact data's two faces are actually
-                # intersecting, using this brute force check:
-                # https://stackoverflow.com/questions/7113344/find-whether-two-triangles-intersect-or-not
-                # I'm not very good at this kind of code. If you know this stuff
-                # please help rewrite this.
-
-                # Get vertices of clashing tris
-                p1 = self.global_data["meshes"][contact.names[0]].faces[contact.index(contact.names[0])]
-                p2 = self.global_data["meshes"][contact.names[1]].faces[contact.index(contact.names[1])]
-                m1 = self.global_data["matrices"][contact.names[0]]
-                m2 = self.global_data["matrices"][contact.names[1]]
-                v1 = []
-                v2 = []
-
-                for v in p1:
-                    v1.append(
-                        (m1 @ np.array([*self.global_data["meshes"][contact.names[0]].vertices[v], 1]))[0:3].round(2)
-                    )
-                for v in p2:
-                    v2.append(
-                        (m2 @ np.array([*self.global_data["meshes"][contact.names[1]].vertices[v], 1]))[0:3].round(2)
-                    )
-
-                tri1_x = 0
-                tri2_x = 0
-                tri1_x += 1 if self.intersect_line_triangle(v1[0], v1[1], v2[0], v2[1], v2[2]) is not None else 0
-                tri1_x += 1 if self.intersect_line_triangle(v1[1], v1[2], v2[0], v2[1], v2[2]) is not None else 0
-                tri1_x += 1 if self.intersect_line_triangle(v1[2], v1[0], v2[0], v2[1], v2[2]) is not None else 0
-
-                tri2_x += 1 if self.intersect_line_triangle(v2[0], v2[1], v1[0], v1[1], v1[2]) is not None else 0
-                tri2_x += 1 if self.intersect_line_triangle(v2[1], v2[2], v1[0], v1[1], v1[2]) is not None else 0
-                tri2_x += 1 if self.intersect_line_triangle(v2[2], v2[0], v1[0], v1[1], v1[2]) is not None else 0
-                intersections = [tri1_x, tri2_x]
-                if intersections == [0, 2] or intersections == [2, 0] or intersections == [1, 1]:
-                    # This is a penetrating collision
-                    pass
-                else:
-                    # This is probably two triangles which just touch
-                    continue
+    def get_clash_set_signature(self, clash_set):
+        """Returns the definition of a clash set, which needs to be equal to reuse its cached clashes"""
+        files = {ab: [{k: v for k, v in data.items() if k != "ifc"} for data in clash_set.get(ab) or []] for ab in "ab"}
+        return json.dumps([files, clash_set.get("tolerance")], sort_keys=True)
+
+    def get_previous_clash_set(self, clash_set):
+        if self.cache is None:
+            return None
+        previous = self.cache["clash_sets"].get(clash_set["name"])
+        if previous is None or previous["signature"] != self.get_clash_set_signature(clash_set):
+            return None
+        return previous
+
+    def get_incremental_clashes(self, previous, objects, is_internal, tolerance):
+        """Reuses the previous clashes of unchanged elements and only clashes the changed elements
+
+        An element has changed when its fingerprint differs from the previous
+        run, or when it was not part of it. The changed elements are clashed
+        with the elements of which the bounding box overlaps theirs.
+        """
+        fingerprints = self.global_data["fingerprints"]
+        current = {}
+        changed = {}
+        for ab in ["a", "b"]:
+            current[ab] = {o[0] for o in objects[ab]}
+            changed[ab] = {g for g in current[ab] if previous["fingerprints"][ab].get(g) != fingerprints[g]}
+
+        b = "a" if is_internal else "b"
+        clashes = {
+            key: clash
+            for key, clash in previous["clashes"].items()
+            if clash["a_global_id"] in current["a"] - changed["a"] and clash["b_global_id"] in current[b] - changed[b]
+        }
+        self.settings.logger.info(
+            f"Reusing {len(clashes)} clashes, clashing {len(changed['a'] | changed['b'])} changed elements ..."
+        )
 
+        a_changed = [o for o in objects["a"] if o[0] in changed["a"]]
+        a_unchanged = [o for o in objects["a"] if o[0] not in changed["a"]]
+        if is_internal:
+            tasks = [(a_changed, None), (a_changed, self.get_overlapping_objects(a_unchanged, a_changed))]
+        else:
+            b_changed = [o for o in objects["b"] if o[0] in changed["b"]]
+            tasks = [
+                (a_changed, self.get_overlapping_objects(objects["b"], a_changed)),
+                (self.get_overlapping_objects(a_unchanged, b_changed), b_changed),
+            ]
+        for a_objects, b_objects in tasks:
+            if len(a_objects) < (2 if b_objects is None else 1) or b_objects == []:
+                continue
+            self.merge_clashes(clashes, clash_tile((a_objects, b_objects, tolerance)), is_internal)
+        return clashes
+
+    def get_overlapping_objects(self, objects, others):
+        """Returns the objects of which the world bounding box overlaps that of any of the others"""
+        if not objects or not others:
+            return []
+        bounds = np.array([self.get_bounds(o[1], o[2]) for o in objects])
+        other_bounds = np.array([self.get_bounds(o[1], o[2]) for o in others])
+        is_overlapping = np.zeros(len(objects), dtype=bool)
+        for i in range(0, len(others), 64):
+            block = other_bounds[i : i + 64]
+            is_below = (bounds[:, None, 0] <= block[None, :, 1]).all(axis=2)
+            is_above = (block[None, :, 0] <= bounds[:, None, 1]).all(axis=2)
+            is_overlapping |= (is_below & is_above).any(axis=1)
+        return [o for o, overlaps in zip(objects, is_overlapping) if overlaps]
+
+    def get_clashes(self, contacts, tolerance, meshes, matrices):
+        """Returns the deepest contact between every pair of elements that clash by at least the tolerance
+
+        :param contacts: The contact data of the collision managers
+        :param meshes: The meshes of the elements by GlobalId
+        :param matrices: The placement matrices of the elements by GlobalId
+        :returns: A dictionary of clashes by "a_global_id-b_global_id"
+        """
+        contacts = [c for c in contacts if c.raw.penetration_depth >= tolerance]
+
+        # fcl returns contact data for faces that aren't actually
+        # penetrating, but just touching. If our tolerance is zero, then we
+        # consider these as clashes and we move on. If our tolerance is not
+        # zero, fcl has a strange behaviour where the penetration depth can
+        # be a large number even though objects are just touching
+        # https://github.com/flexible-collision-library/fcl/issues/503 In
+        # this case, I don't trust the penetration depth and I run my own
+        # triangle-triangle intersection test. Optimistically, this skips
+        # the false positives. Conservatively, we let the user manually deal
+        # with the false positives and we mark it as a clash.
+        is_optimistic = True  # TODO: let user configure this
+
+        if is_optimistic and tolerance != 0 and contacts:
+            # The faces of all contacts are tested at once, see are_triangles_penetrating()
+            v1 = self.get_contact_triangles(contacts, 0, meshes, matrices)
+            v2 = self.get_contact_triangles(contacts, 1, meshes, matrices)
+            is_penetrating = self.are_triangles_penetrating(v1, v2)
+            contacts = [c for c, p in zip(contacts, is_penetrating) if p]
+
+        clashes = {}
+        for contact in contacts:
+            a_global_id, b_global_id = contact.names
             key = f"{a_global_id}-{b_global_id}"
 
-            if (
-                key in clash_set["clashes"]
-                and clash_set["clashes"][key]["penetration_depth"] > contact.raw.penetration_depth
-            ):
+            if key in clashes and clashes[key]["penetration_depth"] > contact.raw.penetration_depth:
                 continue
 
-            clash_set["clashes"][key] = {
+            clashes[key] = {
                 "a_global_id": a_global_id,
                 "b_global_id": b_global_id,
-                "a_ifc_class": a.is_a(),
-                "b_ifc_class": b.is_a(),
-                "a_name": a.Name,
-                "b_name": b.Name,
                 "normal": list(contact.raw.normal),
                 "position": list(contact.raw.pos),
                 "penetration_depth": contact.raw.penetration_depth,
             }
+        return clashes
+
+    def get_contact_triangles(self, contacts, i, meshes, matrices):
+        """Returns the (n, 3, 3) world coordinates of the faces in contact of the i-th element of every contact"""
+        local = np.empty((len(contacts), 3, 3))
+        transforms = np.empty((len(contacts), 4, 4))
+        for j, contact in enumerate(contacts):
+            name = contact.names[i]
+            mesh = meshes[name]
+            local[j] = mesh.vertices[mesh.faces[contact.index(name)]]
+            transforms[j] = matrices[name]
+        world = np.einsum("nij,nkj->nki", transforms[:, :3, :3], local) + transforms[:, None, :3, 3]
+        return world.round(2)
+
+    def are_triangles_penetrating(self, v1, v2):
+        """Tests pairs of triangles for penetration, as the per-contact intersect_line_triangle() test does
+
+        The edges of each triangle of a pair are intersected with the other
+        triangle. The triangles penetrate when two edges of one triangle, or
+        one edge of each, intersect the other, rather than only touching it.
+        The signed volumes of all pairs are computed in single NumPy passes.
+
+        :param v1: The (n, 3, 3) vertices of the first triangles
+        :param v2: The (n, 3, 3) vertices of the second triangles
+        :returns: A boolean array of length n
+        """
+
+        def signed_tetra_volume(a, b, c, d):
+            return np.sign(np.einsum("ij,ij->i", np.cross(b - a, c - a), d - a) / 6.0)
+
+        def intersects(q1, q2, p1, p2, p3):
+            s1 = signed_tetra_volume(q1, p1, p2, p3)
+            s2 = signed_tetra_volume(q2, p1, p2, p3)
+            s3 = signed_tetra_volume(q1, q2, p1, p2)
+            s4 = signed_tetra_volume(q1, q2, p2, p3)
+            s5 = signed_tetra_volume(q1, q2, p3, p1)
+            return (s1 != s2) & (s3 == s4) & (s4 == s5)
+
+        def count_intersections(a, b):
+            edges = ((0, 1), (1, 2), (2, 0))
+            return sum(intersects(a[:, i], a[:, j], b[:, 0], b[:, 1], b[:, 2]).astype(int) for i, j in edges)
+
+        tri1_x = count_intersections(v1, v2)
+        tri2_x = count_intersections(v2, v1)
+        return ((tri1_x == 0) & (tri2_x == 2)) | ((tri1_x == 2) & (tri2_x == 0)) | ((tri1_x == 1) & (tri2_x == 1))
+
+    def get_tiled_clashes(self, a_objects, b_objects, tolerance, tile_size):
+        """Clashes the objects tile by tile in a pool of worker processes
+
+        The model is divided into a uniform grid of tiles of tile_size. Every
+        object is part of each tile that its bounding box overlaps, so two
+        objects that clash share at least one tile. The tiles that contain
+        objects to clash with each other are clashed by the workers. Clashes
+        found in multiple tiles are merged, keeping the deepest contact.
+
+        :param a_objects: The (name, mesh, matrix, mesh key) of the objects in a
+        :param b_objects: The objects in b, or None to clash the objects in a with each other
+        :returns: A dictionary of clashes by "a_global_id-b_global_id"
+        """
+        tiles = collections.defaultdict(lambda: ([], []))
+        for i, objs in enumerate((a_objects, b_objects or [])):
+            for obj in objs:
+                for tile in self.get_tiles(obj[1], obj[2], tile_size):
+                    tiles[tile][i].append(obj)
+
+        if b_objects is None:
+            tasks = [(a, None, tolerance) for a, b in tiles.values() if len(a) > 1]
+        else:
+            tasks = [(a, b, tolerance) for a, b in tiles.values() if a and b]
+        self.settings.logger.info(f"Clashing {len(tasks)} tiles ...")
+
+        clashes = {}
+        jobs = getattr(self.settings, "jobs", None) or multiprocessing.cpu_count()
+        with multiprocessing.Pool(jobs) as pool:
+            for tile_clashes in pool.imap_unordered(clash_tile, tasks):
+                self.merge_clashes(clashes, tile_clashes, b_objects is None)
+        return clashes
+
+    def merge_clashes(self, clashes, new_clashes, is_internal):
+        """Merges clashes into clashes, keeping the deepest contact of every pair"""
+        for key, clash in new_clashes.items():
+            if is_internal and clash["a_global_id"] > clash["b_global_id"]:
+                # Within a single set of objects, a pair can be found in either order by different managers
+                clash["a_global_id"], clash["b_global_id"] = clash["b_global_id"], clash["a_global_id"]
+                clash["normal"] = [-n for n in clash["normal"]]
+                key = f"{clash['a_global_id']}-{clash['b_global_id']}"
+            if key in clashes and clashes[key]["penetration_depth"] >= clash["penetration_depth"]:
+                continue
+            clashes[key] = clash
+
+    def get_bounds(self, mesh, matrix):
+        """Returns the lower and upper corner of the world bounding box of a placed mesh"""
+        if not len(mesh.vertices):
+            return np.full(3, np.inf), np.full(3, -np.inf)
+        vertices = mesh.vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        return vertices.min(axis=0), vertices.max(axis=0)
+
+    def get_tiles(self, mesh, matrix, tile_size):
+        """Returns the indices of the tiles that the world bounding box of a placed mesh overlaps"""
+        if not len(mesh.vertices):
+            return []
+        lower, upper = self.get_bounds(mesh, matrix)
+        lower = np.floor(lower / tile_size).astype(int)
+        upper = np.floor(upper / tile_size).astype(int)
+        return itertools.product(*[range(l, u + 1) for l, u in zip(lower, upper)])
 
     # https://stackoverflow.com/questions/42740765/intersection-between-line-and-triangle-in-3d
     def intersect_line_triangle(self, q1, q2, p1, p2, p3):
@@ -236,53 +455,145 @@ class IfcClasher:
         with open(self.settings.output, "w", encoding="utf-8") as clashes_file:
             json.dump(results, clashes_file, indent=4)
 
-    def get_element(self, clash_group, global_id):
-        for data in clash_group:
-            try:
-                element = data["ifc"].by_guid(global_id)
-                if element:
-                    return element
-            except:
-                pass
+    def add_elements(self, elements, ifc_file):
+        """Adds the products of a file to a map of GlobalIds to elements, unless an earlier file has the GlobalId"""
+        products = ifc_file.by_type("IfcProduct")
+        global_ids = ifc_file.get_attributes(products, ["GlobalId"])["GlobalId"]
+        for global_id, element in zip(global_ids, products):
+            elements.setdefault(global_id, element)
+
+    def get_element(self, elements, global_id):
+        return elements.get(global_id)
 
-    def add_collision_objects(self, data, cm):
+    def add_collision_objects(self, data, cm=None):
+        """Adds the elements of a file to the collision manager cm, if given, and returns them as the arguments of
+        CollisionManager.add_objects()"""
         self.clash_data["meshes"] = {}
         selector = ifcopenshell.util.selector.Selector()
         if "selector" not in data:
-            iterator = ifcopenshell.geom.iterator(
-                self.geom_settings,
-                data["ifc"],
-                multiprocessing.cpu_count(),
-                exclude=(data["ifc"].by_type("IfcSpatialStructureElement")),
-            )
+            filters = {"exclude": data["ifc"].by_type("IfcSpatialStructureElement")}
         elif data["mode"] == "e":
-            iterator = ifcopenshell.geom.iterator(
-                self.geom_settings,
-                data["ifc"],
-                multiprocessing.cpu_count(),
-                exclude=selector.parse(data["ifc"], data["selector"]),
-            )
+            filters = {"exclude": selector.parse(data["ifc"], data["selector"])}
         elif data["mode"] == "i":
+            filters = {"include": selector.parse(data["ifc"], data["selector"])}
+        objects = []
+        if self.cache is not None:
+            filters = self.add_cached_collision_objects(data, objects, **filters)
+        if filters is not None:
             iterator = ifcopenshell.geom.iterator(
-                self.geom_settings,
-                data["ifc"],
-                multiprocessing.cpu_count(),
-                include=selector.parse(data["ifc"], data["selector"]),
+                self.geom_settings, data["ifc"], multiprocessing.cpu_count(), **filters
             )
-        valid_file = iterator.initialize()
-        if not valid_file:
-            return False
-        old_progress = -1
-        while True:
-            progress = iterator.progress() // 2
-            if progress > old_progress:
-                print("\r[" + "#" * progress + " " * (50 - progress) + "]", end="")
-                old_progress = progress
-            self.add_collision_object(data, cm, iterator.get())
-            if not iterator.next():
-                break
-
-    def add_collision_object(self, data, cm, shape):
+            if iterator.initialize():
+                old_progress = -1
+                while True:
+                    progress = iterator.progress() // 2
+                    if progress > old_progress:
+                        print("\r[" + "#" * progress + " " * (50 - progress) + "]", end="")
+                        old_progress = progress
+                    self.add_collision_object(data, objects, iterator.get())
+                    if not iterator.next():
+                        break
+        # The objects are registered at once, so that the tree of the collision manager is only built once
+        if cm is not None:
+            cm.add_objects(objects)
+        return objects
+
+    def add_cached_collision_objects(self, data, objects, include=None, exclude=None):
+        """Adds the elements of which the fingerprint equals the cached one to objects, using the cached mesh and
+        matrix, and returns the iterator filter for the elements that need to be tessellated, or None"""
+        file_cache = self.cache["files"].setdefault(data["file"], {})
+        self.instance_hashes = {}
+        if include is None:
+            excluded = set(exclude or ())
+            include = [e for e in data["ifc"].by_type("IfcProduct") if e not in excluded]
+        changed = []
+        for element in include:
+            if not getattr(element, "Representation", None) or element.is_a("IfcOpeningElement"):
+                continue
+            fingerprint = self.get_fingerprint(data["ifc"], element)
+            self.global_data["fingerprints"][element.GlobalId] = fingerprint
+            self.cache["used"][data["file"]].add(element.GlobalId)
+            cached = file_cache.get(element.GlobalId)
+            if cached is None or cached["fingerprint"] != fingerprint:
+                changed.append(element)
+                continue
+            mesh = Mesh()
+            mesh.vertices = cached["vertices"]
+            mesh.faces = cached["faces"]
+            self.global_data["meshes"][element.GlobalId] = mesh
+            self.global_data["matrices"][element.GlobalId] = cached["matrix"]
+            objects.append((element.GlobalId, mesh, cached["matrix"], (data["file"], fingerprint[0])))
+        self.settings.logger.info(f"Reusing {len(objects)} cached meshes, tessellating {len(changed)} elements ...")
+        return {"include": changed} if changed else None
+
+    def get_fingerprint(self, ifc_file, element):
+        """Returns the hashes of the geometry and placement of an element
+
+        The geometry includes the openings of the element, as they are
+        subtracted from its mesh.
+        """
+        openings = [rel.RelatedOpeningElement for rel in getattr(element, "HasOpenings", None) or ()]
+        return (
+            self.get_subgraph_hash(ifc_file, [element.Representation] + openings),
+            self.get_subgraph_hash(ifc_file, [element.ObjectPlacement]),
+        )
+
+    def get_subgraph_hash(self, ifc_file, instances):
+        """Returns a hash of the instances and the instances they reference, independent of their ids"""
+        h = hashlib.blake2b(digest_size=16)
+        for instance in instances:
+            h.update(b"$;" if instance is None else self.get_instance_hash(ifc_file, instance.id()).encode() + b";")
+        return h.hexdigest()
+
+    def get_instance_hash(self, ifc_file, instance_id):
+        """Returns a hash of an instance in which references are replaced by the hashes of the referenced instances
+
+        Hashes are cached by id while a file is loaded, so that subgraphs shared
+        by many elements, such as representation maps, are only hashed once.
+        Referenced instances are hashed depth first using an explicit stack, as
+        chains such as nested boolean results can exceed the recursion limit.
+        """
+        digest = self.instance_hashes.get(instance_id)
+        if digest is not None:
+            return digest
+        stack = [self.get_instance_segments(ifc_file, instance_id)]
+        while stack:
+            frame = stack[-1]
+            segments = frame[1]
+            i = frame[2]
+            while i < len(segments):
+                if isinstance(segments[i], int):
+                    digest = self.instance_hashes.get(segments[i])
+                    if digest is None:
+                        break
+                    segments[i] = "#" + digest
+                i += 1
+            frame[2] = i
+            if i < len(segments):
+                # The referenced instance is hashed first, after which this instance is continued
+                stack.append(self.get_instance_segments(ifc_file, segments[i]))
+                continue
+            stack.pop()
+            content = "".join(segments)
+            self.instance_hashes[frame[0]] = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        return self.instance_hashes[instance_id]
+
+    def get_instance_segments(self, ifc_file, instance_id):
+        """Splits the attributes of an instance into text and the ids of referenced instances"""
+        # Guards against cyclic references, which are hashed as a constant
+        self.instance_hashes[instance_id] = "cycle"
+        content = str(ifc_file.by_id(instance_id)).split("=", 1)[1]
+        segments = []
+        end = 0
+        # References within quoted strings are left as they are
+        for m in re.finditer(r"'(?:[^']|'')*'|#(\d+)", content):
+            segments.append(content[end : m.start()])
+            segments.append(m.group(0) if m.group(1) is None else int(m.group(1)))
+            end = m.end()
+        segments.append(content[end:])
+        return [instance_id, segments, 0]
+
+    def add_collision_object(self, data, objects, shape):
         if shape is None:
             return
         element = data["ifc"].by_id(shape.guid)
@@ -300,7 +611,19 @@ class IfcClasher:
 
         mat.transpose()
         self.global_data["matrices"][shape.guid] = mat
-        cm.add_object(shape.guid, mesh, mat)
+        # Elements with the same representation share the BVH of its mesh
+        key = (data["file"], shape.geometry.id)
+        if self.cache is not None:
+            fingerprint = self.global_data["fingerprints"][shape.guid]
+            # Geometry ids are not stable between runs, so cached and new meshes are shared by their fingerprint
+            key = (data["file"], fingerprint[0])
+            self.cache["files"][data["file"]][shape.guid] = {
+                "fingerprint": fingerprint,
+                "vertices": mesh.vertices,
+                "faces": mesh.faces,
+                "matrix": mat,
+            }
+        objects.append((shape.guid, mesh, mat, key))
 
     def create_mesh(self, shape):
         f = shape.geometry.faces
@@ -426,10 +749,40 @@ class IfcClasher:
         return output_clash_sets
 
 
+CACHE_VERSION = 2
+
+
+def clash_tile(args):
+    """Clashes the objects of a tile in a worker process"""
+    a_objects, b_objects, tolerance = args
+    managers = []
+    for objects in (a_objects, b_objects):
+        if objects is not None:
+            managers.append(collision.CollisionManager())
+            managers[-1].add_objects(objects)
+    if b_objects is None:
+        results = managers[0].in_collision_internal(return_data=True)
+    else:
+        results = managers[0].in_collision_other(managers[1], return_data=True)
+    if not results[0]:
+        return {}
+    objects = a_objects + (b_objects or [])
+    meshes = {obj[0]: obj[1] for obj in objects}
+    matrices = {obj[0]: obj[2] for obj in objects}
+    return IfcClasher(None).get_clashes(results[1], tolerance, meshes, matrices)
+
+
 class IfcClashSettings:
     def __init__(self):
         self.logger = None
         self.output = "clashes.json"
+        # When larger than zero, the model is clashed in tiles of this size by a pool of processes
+        self.tile_size = 0
+        # The number of processes to clash tiles with, by default the number of processors
+        self.jobs = None
+        # A file to store meshes and clashes in, so that the next run only clashes changed elements. The file is
+        # read with pickle.load(), which can run arbitrary code, so only use cache files from a trusted source.
+        self.cache = None
 
 
 if __name__ == "__main__":
@@ -438,10 +791,33 @@ if __name__ == "__main__":
     parser.add_argument(
         "-o", "--output", type=str, help="The JSON diff file to output. Defaults to output.json", default="output.json"
     )
+    parser.add_argument(
+        "-t",
+        "--tile-size",
+        type=float,
+        help="Clash the model in tiles of this size in parallel processes. Defaults to 0, which disables tiling",
+        default=0,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The number of processes to clash tiles with. Defaults to the number of processors",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        type=str,
+        help="A file to cache meshes and clashes in, so that later runs only clash the elements that changed. "
+        "The file is loaded with pickle, so only use cache files that you trust",
+    )
     args = parser.parse_args()
 
     settings = IfcClashSettings()
     settings.output = args.output
+    settings.tile_size = args.tile_size
+    settings.jobs = args.jobs
+    settings.cache = args.cache
     settings.logger = logging.getLogger("Clash")
     settings.logger.setLevel(logging.DEBUG)
     handler = logging.StreamHandler(sys.stdout)
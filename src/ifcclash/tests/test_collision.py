@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+fcl = pytest.importorskip("fcl")
+
+from collision import CollisionManager
+from ifcclash import Mesh
+
+
+def get_cube():
+    mesh = Mesh()
+    mesh.vertices = np.array(
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=float
+    )
+    mesh.faces = np.array(
+        [[0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7], [0, 1, 5], [0, 5, 4]]
+        + [[1, 2, 6], [1, 6, 5], [2, 3, 7], [2, 7, 6], [3, 0, 4], [3, 4, 7]]
+    )
+    return mesh
+
+
+def get_translation(x):
+    matrix = np.eye(4)
+    matrix[0, 3] = x
+    return matrix
+
+
+@pytest.mark.parametrize("key", [None, "k"])
+def test_duplicate_objects_are_told_apart(key):
+    # Copy-pasted elements share a BVH and a transform, but are still distinct objects
+    cube = get_cube()
+    cm = CollisionManager()
+    cm.add_objects([("A", cube, np.eye(4), key), ("B", cube, np.eye(4), key), ("C", cube, get_translation(0.5), key)])
+    assert sorted(cm.in_collision_internal(return_names=True)[1]) == [("A", "B"), ("A", "C"), ("B", "C")]
+    contacts = cm.in_collision_internal(return_data=True)[1]
+    assert sorted({tuple(sorted(c.names)) for c in contacts}) == [("A", "B"), ("A", "C"), ("B", "C")]
+
+    cm.remove_object("A")
+    assert sorted(cm.in_collision_internal(return_names=True)[1]) == [("B", "C")]
+
+
+def test_duplicate_objects_collide_with_other_manager():
+    cube = get_cube()
+    a = CollisionManager()
+    a.add_objects([("A", cube, np.eye(4), "k"), ("B", cube, np.eye(4), "k")])
+    b = CollisionManager()
+    b.add_objects([("X", cube, get_translation(0.5), "k"), ("Y", cube, get_translation(0.5), "k")])
+    expected = [("A", "X"), ("A", "Y"), ("B", "X"), ("B", "Y")]
+    assert sorted(a.in_collision_other(b, return_names=True)[1]) == expected
+    assert sorted(a.in_collision_single(cube, get_translation(0.5), return_names=True)[1]) == ["A", "B"]
+
+
+def test_set_transform_of_duplicate_object():
+    cube = get_cube()
+    cm = CollisionManager()
+    cm.add_objects([("A", cube, np.eye(4), "k"), ("B", cube, np.eye(4), "k"), ("C", cube, get_translation(5), "k")])
+    cm.set_transform("A", get_translation(5.5))
+    assert sorted(cm.in_collision_internal(return_names=True)[1]) == [("A", "C")]
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ifcclash import IfcClasher, Mesh
+
+
+class Contact:
+    def __init__(self, names, faces):
+        self.names = names
+        self.faces = dict(zip(names, faces))
+
+    def index(self, name):
+        return self.faces[name]
+
+
+def is_penetrating(clasher, v1, v2):
+    # The per-contact test of the optimistic false positive filter
+    tri1_x = 0
+    tri2_x = 0
+    tri1_x += 1 if clasher.intersect_line_triangle(v1[0], v1[1], v2[0], v2[1], v2[2]) is not None else 0
+    tri1_x += 1 if clasher.intersect_line_triangle(v1[1], v1[2], v2[0], v2[1], v2[2]) is not None else 0
+    tri1_x += 1 if clasher.intersect_line_triangle(v1[2], v1[0], v2[0], v2[1], v2[2]) is not None else 0
+    tri2_x += 1 if clasher.intersect_line_triangle(v2[0], v2[1], v1[0], v1[1], v1[2]) is not None else 0
+    tri2_x += 1 if clasher.intersect_line_triangle(v2[1], v2[2], v1[0], v1[1], v1[2]) is not None else 0
+    tri2_x += 1 if clasher.intersect_line_triangle(v2[2], v2[0], v1[0], v1[1], v1[2]) is not None else 0
+    return [tri1_x, tri2_x] in ([0, 2], [2, 0], [1, 1])
+
+
+TRIANGLE_PAIRS = (
+    # Penetrating
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((0.5, 0.5, -1), (0.5, 0.5, 1), (1.5, 0.5, 1)), True),
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((0.5, 0.5, -1), (0.5, 0.5, 1), (0.5, 3, 0)), True),
+    # Separated
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((0, 0, 1), (2, 0, 1), (0, 2, 1)), False),
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((3, 3, -1), (3, 3, 1), (4, 3, 0)), False),
+    # Touching
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((0, 0, 0), (2, 0, 0), (0, 0, 2)), False),
+    (((0, 0, 0), (2, 0, 0), (0, 2, 0)), ((0, 0, 0), (2, 0, 0), (1, 0, -2)), False),
+)
+
+
+@pytest.fixture
+def clasher():
+    return IfcClasher(None)
+
+
+@pytest.mark.parametrize("v1,v2,expected", TRIANGLE_PAIRS)
+def test_triangle_pairs(clasher, v1, v2, expected):
+    v1 = np.array(v1, dtype=float)
+    v2 = np.array(v2, dtype=float)
+    assert is_penetrating(clasher, v1, v2) == expected
+    assert list(clasher.are_triangles_penetrating(v1[None], v2[None])) == [expected]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_triangle_pairs_match_scalar_test(clasher, seed):
+    rng = np.random.default_rng(seed)
+    # Coordinates on a coarse grid produce many touching and coplanar pairs
+    v1 = rng.integers(0, 4, (500, 3, 3)).astype(float)
+    v2 = rng.integers(0, 4, (500, 3, 3)).astype(float)
+    expected = [is_penetrating(clasher, a, b) for a, b in zip(v1, v2)]
+    assert list(clasher.are_triangles_penetrating(v1, v2)) == expected
+
+
+def test_contact_triangles_are_placed_and_rounded(clasher):
+    mesh = Mesh()
+    mesh.vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0.123, 0.456, 0.789]])
+    mesh.faces = np.array([[0, 1, 2], [1, 2, 3]])
+    angle = np.radians(30)
+    matrix = np.array(
+        [
+            [np.cos(angle), -np.sin(angle), 0, 10],
+            [np.sin(angle), np.cos(angle), 0, 20],
+            [0, 0, 1, 30],
+            [0, 0, 0, 1],
+        ]
+    )
+    contacts = [Contact(("a", "b"), (1, 0)), Contact(("b", "a"), (1, 1))]
+    meshes = {"a": mesh, "b": mesh}
+    matrices = {"a": matrix, "b": np.eye(4)}
+    for i in range(2):
+        triangles = clasher.get_contact_triangles(contacts, i, meshes, matrices)
+        for contact, triangle in zip(contacts, triangles):
+            name = contact.names[i]
+            face = mesh.faces[contact.index(name)]
+            expected = [(matrices[name] @ np.array([*mesh.vertices[v], 1]))[0:3].round(2) for v in face]
+            assert np.allclose(triangle, expected)
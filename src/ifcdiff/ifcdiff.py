@@ -1,23 +1,51 @@
 #!/usr/bin/env python3
 # This can be packaged with `pyinstaller --onefile --clean --icon=icon.ico ifcdiff.py`
 
+import os
 import ifcopenshell
+import ifcopenshell.geom
 from deepdiff import DeepDiff
 import time
 import json
 import argparse
 import decimal
+import hashlib
+import itertools
+import multiprocessing
 
 
 class IfcDiff:
-    def __init__(self, old_file, new_file, output_file, inverse_classes=None):
+    def __init__(
+        self,
+        old_file,
+        new_file,
+        output_file,
+        inverse_classes=None,
+        jobs=1,
+        geometry=False,
+        output_format="json",
+        resume=False,
+    ):
         self.old_file = old_file
         self.new_file = new_file
         self.output_file = output_file
         self.change_register = {}
-        self.representation_ids = []
+        self.representation_ids = set()
         self.inverse_classes = inverse_classes
         self.precision = 2
+        self.jobs = jobs
+        self.geometry = geometry
+        # Signatures of tessellated representations by geometry id, for the old and new file
+        self.old_meshes = {}
+        self.new_meshes = {}
+        self.old_hasher = None
+        self.new_hasher = None
+        # The (old shape, new shape) of elements with changed geometry hashes by GlobalId, see get_shapes()
+        self.tessellated_shapes = {}
+        self.output_format = output_format
+        self.resume = resume
+        self.writer = None
+        self.chunk_size = 1000
 
     def diff(self):
         print("# IFC Diff")
@@ -38,26 +66,126 @@ class IfcDiff:
         print(" - {} item(s) were retained between the old and new IFC file".format(total_same_elements))
 
         start = time.time()
+
+        same_elements = sorted(same_elements)
+        geometry_elements = self.get_geometry_elements(same_elements)
+
+        total_changed = 0
+        if self.output_format == "jsonl":
+            self.writer = JsonLinesWriter(self.output_file, self.resume)
+            if self.writer.checkpoint is None:
+                self.writer.write_header(self.added_elements, self.deleted_elements)
+            else:
+                print(" - Resuming after {} of {} item(s)".format(self.writer.checkpoint, total_same_elements))
+                same_elements = [g for g in same_elements if g > self.writer.checkpoint]
+                total_changed = self.writer.total_changed
+
+        if self.geometry:
+            self.tessellated_shapes = self.get_tessellated_shapes(geometry_elements.intersection(same_elements))
+
+        # Elements are diffed in chunks of sorted GlobalIds, after each of which changes are streamed to the writer
+        chunks = [same_elements[i : i + self.chunk_size] for i in range(0, len(same_elements), self.chunk_size)]
+        if self.jobs > 1:
+            results = self.diff_concurrently(chunks, geometry_elements)
+        else:
+            results = ((chunk, self.diff_elements(chunk, geometry_elements)) for chunk in chunks)
+
         total_diffed = 0
+        total_skipped = 0
+        for chunk, skipped in results:
+            total_diffed += len(chunk)
+            total_skipped += skipped
+            print("{}/{} diffed ...".format(total_diffed, len(same_elements)), end="\r", flush=True)
+            if self.writer:
+                total_changed += len(self.change_register)
+                self.writer.write_changes(self.change_register, chunk[-1])
+                self.change_register = {}
+
+        total_changed += len(self.change_register)
+        print(" - {} item(s) had identical data hashes and were not compared in detail".format(total_skipped))
+        print(" - {} item(s) were changed either geometrically or with data".format(total_changed))
+        print("# Diff finished in {:.2f} seconds".format(time.time() - start))
+
+    def get_geometry_elements(self, global_ids):
+        """Returns the GlobalIds of the elements of which the geometry is diffed, one per representation"""
+        geometry_elements = set()
+        for global_id in global_ids:
+            representation_id = self.get_representation_id(self.new.by_id(global_id))
+            if representation_id in self.representation_ids:
+                continue
+            self.representation_ids.add(representation_id)
+            geometry_elements.add(global_id)
+        return geometry_elements
 
-        for global_id in same_elements:
-            total_diffed += 1
-            print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
+    def diff_elements(self, global_ids, geometry_elements):
+        """Diffs the elements with the given GlobalIds and returns the number of elements with equal data hashes"""
+        total_skipped = 0
+        old_hasher, new_hasher = self.get_hashers()
+
+        for global_id in global_ids:
             old_element = self.old.by_id(global_id)
             new_element = self.new.by_id(global_id)
-            self.diff_element(old_element, new_element)
-            self.diff_element_inverse_relationships(old_element, new_element)
 
-            representation_id = self.get_representation_id(new_element)
-            if representation_id in self.representation_ids:
+            # Elements are only compared in detail when their content hashes differ
+            if self.get_data_hash(old_hasher, self.old, old_element) != self.get_data_hash(
+                new_hasher, self.new, new_element
+            ):
+                self.diff_element(old_element, new_element)
+                self.diff_element_inverse_relationships(old_element, new_element)
+            else:
+                total_skipped += 1
+
+            if global_id not in geometry_elements:
                 continue
-            self.representation_ids.append(representation_id)
-            self.diff_element_geometry(old_element, new_element)
+            if self.geometry:
+                # The geometry hashes of these elements have already been compared by get_tessellated_shapes()
+                if global_id in self.tessellated_shapes:
+                    old_shape, new_shape = self.tessellated_shapes[global_id]
+                    self.diff_tessellated_geometry(old_element, new_element, old_shape, new_shape)
+            elif self.get_geometry_hash(old_hasher, old_element) != self.get_geometry_hash(new_hasher, new_element):
+                self.diff_element_geometry(old_element, new_element)
 
-        print(" - {} item(s) were changed either geometrically or with data".format(len(self.change_register.keys())))
-        print("# Diff finished in {:.2f} seconds".format(time.time() - start))
+        return total_skipped
+
+    def get_hashers(self):
+        # Hashes of referenced instances are kept between chunks
+        if self.old_hasher is None:
+            self.old_hasher = ContentHasher(self.precision)
+            self.new_hasher = ContentHasher(self.precision)
+        return self.old_hasher, self.new_hasher
+
+    def diff_concurrently(self, chunks, geometry_elements):
+        """Diffs chunks of GlobalIds in a pool of worker processes
+
+        Every worker opens both files once. The change register of every chunk
+        is merged in the order of the chunks, after which the chunk is yielded
+        with the number of its elements with equal data hashes.
+        """
+        pool = multiprocessing.Pool(
+            self.jobs,
+            initializer=init_worker,
+            initargs=(
+                self.old_file,
+                self.new_file,
+                self.inverse_classes,
+                self.jobs,
+                self.geometry,
+                self.tessellated_shapes,
+            ),
+        )
+        try:
+            shards = [(chunk, geometry_elements.intersection(chunk)) for chunk in chunks]
+            for chunk, (change_register, skipped) in zip(chunks, pool.imap(diff_shard, shards)):
+                self.change_register.update(json.loads(change_register))
+                yield chunk, skipped
+        finally:
+            pool.close()
+            pool.join()
 
     def export(self):
+        if self.writer:
+            self.writer.close()
+            return
         with open(self.output_file, "w", encoding="utf-8") as diff_file:
             json.dump(
                 {
@@ -66,15 +194,20 @@ class IfcDiff:
                     "changed": self.change_register,
                 },
                 diff_file,
-                indent=4,
+                indent=4 if self.output_format == "json" else None,
+                separators=None if self.output_format == "json" else (",", ":"),
                 cls=DiffEncoder,
             )
 
-    def load(self):
-        print("Loading old file ...")
-        self.old = ifcopenshell.open(self.old_file)
-        print("Loading new file ...")
-        self.new = ifcopenshell.open(self.new_file)
+    def load(self, verbose=True):
+        # When diffing with multiple jobs the files are memory-mapped, so that their pages are shared by the workers
+        mmap = self.jobs > 1 and ifcopenshell.ifcopenshell_wrapper.has_mmap()
+        if verbose:
+            print("Loading old file ...")
+        self.old = ifcopenshell.open(self.old_file, mmap=mmap)
+        if verbose:
+            print("Loading new file ...")
+        self.new = ifcopenshell.open(self.new_file, mmap=mmap)
 
     def get_precision(self):
         try:
@@ -105,17 +238,17 @@ class IfcDiff:
         if diff and new_element.GlobalId:
             self.change_register.setdefault(new_element.GlobalId, {}).update(diff)
 
+    def get_inverse_relationships(self, ifc_file, element):
+        relationships = ifc_file.get_inverse(element)
+        if self.inverse_classes[0] == "all":
+            return relationships
+        return [x for x in relationships if x.is_a() in self.inverse_classes]
+
     def diff_element_inverse_relationships(self, old_element, new_element):
         if not self.inverse_classes:
             return
-        old_relationships_all = self.old.get_inverse(old_element)
-        new_relationships_all = self.new.get_inverse(new_element)
-        if self.inverse_classes[0] == "all":
-            old_relationships = old_relationships_all
-            new_relationships = new_relationships_all
-        else:
-            old_relationships = [x for x in old_relationships_all if x.is_a() in self.inverse_classes]
-            new_relationships = [x for x in new_relationships_all if x.is_a() in self.inverse_classes]
+        old_relationships = self.get_inverse_relationships(self.old, old_element)
+        new_relationships = self.get_inverse_relationships(self.new, new_element)
 
         diff = DeepDiff(
             old_relationships,
@@ -123,15 +256,7 @@ class IfcDiff:
             significant_digits=self.precision,
             ignore_string_type_changes=True,
             ignore_numeric_type_changes=True,
-            exclude_regex_paths=[
-                r"root.*id$",
-                r".*GlobalId.*",
-                r".*OwnerHistory.*",
-                r".*RelatedObjects.*",
-                r".*RelatingObject.*",
-                r".*RelatingDefinitions.*",
-                r".*RelatedObjectsType.*",  # Deprecated in IFC4 anyway
-            ],
+            exclude_regex_paths=[r"root.*id$"] + [r".*{}.*".format(name) for name in INVERSE_EXCLUDED_ATTRIBUTES],
         )
         if diff and new_element.GlobalId:
             self.change_register.setdefault(new_element.GlobalId, {}).update(diff)
@@ -179,6 +304,129 @@ class IfcDiff:
             if new_element.GlobalId:
                 return self.change_register.setdefault(new_element.GlobalId, {}).update({"has_geometry_change": True})
 
+    def get_data_hash(self, hasher, ifc_file, element):
+        """Hashes the attributes compared by diff_element() and diff_element_inverse_relationships()"""
+        h = hasher.new()
+        hasher.update_attributes(h, element, ("Representation", "OwnerHistory", "ObjectPlacement"), ("OwnerHistory",))
+        if self.inverse_classes:
+            hasher.update(h, tuple(self.get_inverse_relationships(ifc_file, element)), INVERSE_EXCLUDED_ATTRIBUTES)
+        return h.digest()
+
+    def get_geometry_hash(self, hasher, element):
+        """Hashes the attributes compared by diff_element_geometry()"""
+        h = hasher.new()
+        hasher.update(h, (element.ObjectPlacement, element.Representation))
+        # Relationship GUIDs and owner histories change on re-export without changing the geometry
+        hasher.update(h, getattr(element, "HasOpenings", None), GEOMETRY_EXCLUDED_ATTRIBUTES)
+        hasher.update(h, getattr(element, "HasProjections", None), GEOMETRY_EXCLUDED_ATTRIBUTES)
+        return h.digest()
+
+    def get_tessellated_shapes(self, global_ids):
+        """Returns the (old shape, new shape) of the elements with changed geometry hashes by GlobalId
+
+        The elements of all chunks are tessellated at once, with a single
+        iterator per file, as initializing an iterator processes all
+        representations in the file. Shapes are None when an element could
+        not be tessellated.
+        """
+        old_hasher, new_hasher = self.get_hashers()
+        element_pairs = []
+        for global_id in sorted(global_ids):
+            old_element = self.old.by_id(global_id)
+            new_element = self.new.by_id(global_id)
+            if self.get_geometry_hash(old_hasher, old_element) != self.get_geometry_hash(new_hasher, new_element):
+                element_pairs.append((old_element, new_element))
+        print(" - {} item(s) with changed geometry are tessellated".format(len(element_pairs)))
+        old_shapes = self.get_shapes(self.old, [p[0] for p in element_pairs], self.old_meshes)
+        new_shapes = self.get_shapes(self.new, [p[1] for p in element_pairs], self.new_meshes)
+        return {
+            new_element.GlobalId: (old_shapes.get(old_element.id()), new_shapes.get(new_element.id()))
+            for old_element, new_element in element_pairs
+        }
+
+    def diff_tessellated_geometry(self, old_element, new_element, old_shape, new_shape):
+        """Compares the tessellated geometry of an old and new element
+
+        A changed element is registered with the kind of change and the largest
+        displacement of its bounding box in world coordinates.
+        """
+        if old_shape is None and new_shape is None:
+            # Neither could be tessellated, so fall back to comparing the entity graphs
+            return self.diff_element_geometry(old_element, new_element)
+        if not new_element.GlobalId:
+            return
+        change = {"has_geometry_change": True}
+        if old_shape and new_shape:
+            # The bounding box follows from the mesh and placement, which are compared after quantization
+            if old_shape[:2] == new_shape[:2]:
+                return
+            displacement = max([abs(a - b) for a, b in zip(old_shape[2], new_shape[2])] or [0.0])
+            change["geometry_change"] = {
+                "shape_changed": old_shape[0] != new_shape[0],
+                "placement_changed": old_shape[1] != new_shape[1],
+                "bounding_box_change": round(displacement, self.precision),
+            }
+        self.change_register.setdefault(new_element.GlobalId, {}).update(change)
+
+    def get_shapes(self, ifc_file, elements, meshes):
+        """Returns the (mesh hash, placement, world bounding box) of the elements by id
+
+        The elements are tessellated with a multi-threaded geometry iterator. The
+        hash and bounding box of a mesh are computed once per representation and
+        stored in meshes, so that mapped representations are only hashed once.
+        """
+        shapes = {}
+        if not elements:
+            return shapes
+        settings = ifcopenshell.geom.settings()
+        iterator = ifcopenshell.geom.iterator(settings, ifc_file, multiprocessing.cpu_count(), include=elements)
+        if not iterator.initialize():
+            return shapes
+        while True:
+            shape = iterator.get()
+            mesh = meshes.get(shape.geometry.id)
+            if mesh is None:
+                mesh = meshes[shape.geometry.id] = self.get_mesh_signature(shape.geometry)
+            m = shape.transformation.matrix.data
+            placement = tuple(round(v, self.precision) + 0.0 for v in m)
+            shapes[shape.id] = (mesh[0], placement, self.get_world_bounding_box(mesh[1], m))
+            if not iterator.next():
+                break
+        return shapes
+
+    def get_mesh_signature(self, geometry):
+        """Returns a hash of the quantized triangles of a mesh, independent of their order, and its bounding box"""
+        import numpy as np
+
+        verts = np.frombuffer(geometry.verts_buffer, dtype=np.float64).reshape(-1, 3)
+        faces = np.frombuffer(geometry.faces_buffer, dtype=np.intc).reshape(-1, 3)
+        scale = 10 ** self.precision
+        points = np.round(verts * scale).astype(np.int64)
+        # Triangles are rotated to start at their smallest vertex, which preserves their orientation
+        point_ranks = np.unique(points, axis=0, return_inverse=True)[1].reshape(-1)
+        start = np.argmin(point_ranks[faces], axis=1)
+        faces = np.take_along_axis(faces, (start[:, None] + np.arange(3)) % 3, axis=1)
+        triangles = points[faces].reshape(-1, 9)
+        triangles = triangles[np.lexsort(triangles.T[::-1])]
+        digest = hashlib.blake2b(triangles.tobytes(), digest_size=16).digest()
+        if not len(verts):
+            return digest, None
+        return digest, (tuple(verts.min(axis=0).tolist()), tuple(verts.max(axis=0).tolist()))
+
+    def get_world_bounding_box(self, bounding_box, m):
+        if bounding_box is None:
+            return ()
+        # The matrix is stored column by column, with the translation in the last column
+        points = [
+            (
+                m[0] * x + m[3] * y + m[6] * z + m[9],
+                m[1] * x + m[4] * y + m[7] * z + m[10],
+                m[2] * x + m[5] * y + m[8] * z + m[11],
+            )
+            for x, y, z in itertools.product(*zip(*bounding_box))
+        ]
+        return tuple(min(p[i] for p in points) for i in range(3)) + tuple(max(p[i] for p in points) for i in range(3))
+
     def get_representation_id(self, element):
         if not element.Representation:
             return None
@@ -194,6 +442,76 @@ class IfcDiff:
                 return representation.Items[0].MappingSource.MappedRepresentation.id()
 
 
+INVERSE_EXCLUDED_ATTRIBUTES = (
+    "GlobalId",
+    "OwnerHistory",
+    "RelatedObjects",
+    "RelatingObject",
+    "RelatingDefinitions",
+    "RelatedObjectsType",  # Deprecated in IFC4 anyway
+)
+
+GEOMETRY_EXCLUDED_ATTRIBUTES = (
+    "GlobalId",
+    "OwnerHistory",
+    "RelatingBuildingElement",  # The element itself, which is hashed separately
+    "RelatingElement",
+)
+
+
+class ContentHasher:
+    """Computes canonical hashes of the attribute subgraphs of instances in a file
+
+    Instance ids are not part of the hash, so that equal content in different
+    files results in equal hashes, and numbers are rounded to the precision of
+    the diff. The hashes of referenced instances are cached, so that shared
+    subgraphs such as placements and representation items are only hashed once.
+    """
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.hashes = {}
+
+    def new(self):
+        return hashlib.blake2b(digest_size=16)
+
+    def update_attributes(self, h, inst, exclude=(), exclude_nested=()):
+        """Updates h with the type and attributes of inst, except those in exclude or, in referenced instances,
+        exclude_nested"""
+        h.update(inst.is_a().encode())
+        for name, value in zip(inst.wrapped_data.get_attribute_names(), inst):
+            if name not in exclude and name not in exclude_nested:
+                self.update(h, value, exclude_nested)
+
+    def update(self, h, value, exclude=()):
+        if isinstance(value, ifcopenshell.entity_instance):
+            if not value.id():
+                # Defined types in select attributes are hashed by their type and value
+                h.update(value.is_a().encode())
+                self.update(h, value.wrappedValue)
+                return
+            key = (exclude, value.id())
+            digest = self.hashes.get(key)
+            if digest is None:
+                instance_hash = self.new()
+                self.update_attributes(instance_hash, value, exclude, exclude)
+                digest = self.hashes[key] = instance_hash.digest()
+            h.update(b"#" + digest)
+        elif isinstance(value, tuple):
+            h.update(b"(")
+            for v in value:
+                self.update(h, v, exclude)
+            h.update(b")")
+        elif value is None or isinstance(value, bool):
+            h.update(repr(value).encode())
+        elif isinstance(value, (int, float)):
+            # Rounded like DeepDiff does with significant_digits, which also ignores numeric type changes
+            h.update("n{:.{}f};".format(round(value, self.precision) + 0.0, self.precision).encode())
+        else:
+            value = str(value).encode()
+            h.update("s{}:".format(len(value)).encode() + value)
+
+
 class DiffEncoder(json.JSONEncoder):
     def default(self, obj):
         try:
@@ -202,6 +520,92 @@ class DiffEncoder(json.JSONEncoder):
             return str(obj)
 
 
+class JsonLinesWriter:
+    """Writes the results of a diff as JSON lines while the diff runs
+
+    The first lines hold the added and deleted GlobalIds. Every following
+    line holds the changes of one element, and after every chunk of elements
+    a checkpoint line holds the last GlobalId that was diffed. When resuming,
+    anything after the last checkpoint is discarded and the diff continues
+    with the GlobalIds after it. A final line marks the diff as finished.
+    """
+
+    def __init__(self, filename, resume=False):
+        self.checkpoint = None
+        self.total_changed = 0
+        if resume and os.path.exists(filename):
+            offset = self.read_checkpoint(filename)
+            if self.checkpoint is not None:
+                self.file = open(filename, "r+b")
+                self.file.seek(offset)
+                self.file.truncate()
+                return
+        self.file = open(filename, "wb")
+
+    def read_checkpoint(self, filename):
+        """Reads the last checkpoint and returns the offset of the line after it"""
+        offset = 0
+        total_changed = 0
+        with open(filename, "rb") as f:
+            position = 0
+            for line in f:
+                position += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if "changed" in record:
+                    total_changed += 1
+                elif "checkpoint" in record:
+                    self.checkpoint = record["checkpoint"]
+                    self.total_changed = total_changed
+                    offset = position
+        return offset
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":"), cls=DiffEncoder).encode("utf-8") + b"\n")
+
+    def write_header(self, added_elements, deleted_elements):
+        self.write({"added": sorted(added_elements)})
+        self.write({"deleted": sorted(deleted_elements)})
+        # An empty checkpoint precedes all GlobalIds
+        self.write({"checkpoint": ""})
+        self.file.flush()
+
+    def write_changes(self, change_register, checkpoint):
+        for global_id in sorted(change_register):
+            self.write({"changed": global_id, "changes": change_register[global_id]})
+        self.write({"checkpoint": checkpoint})
+        self.file.flush()
+
+    def close(self):
+        self.write({"finished": True})
+        self.file.close()
+
+
+worker = None
+
+
+def init_worker(old_file, new_file, inverse_classes, jobs, geometry, tessellated_shapes):
+    """Opens the files to diff in a worker process"""
+    global worker
+    worker = IfcDiff(old_file, new_file, None, inverse_classes, jobs, geometry)
+    worker.load(verbose=False)
+    worker.precision = worker.get_precision()
+    worker.tessellated_shapes = tessellated_shapes
+
+
+def diff_shard(args):
+    """Diffs a chunk of the retained elements in a worker process"""
+    global_ids, geometry_elements = args
+    worker.change_register = {}
+    total_skipped = worker.diff_elements(global_ids, geometry_elements)
+    # The register is encoded as it would be exported, as the diffs can reference instances that cannot be pickled
+    return json.dumps(worker.change_register, cls=DiffEncoder), total_skipped
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Show the difference between two IFC files")
     parser.add_argument("old", type=str, help="The old IFC file")
@@ -216,8 +620,41 @@ if __name__ == "__main__":
         help='A list of IFC classes to check in inverse relationships, like "IfcRelDefinesByProperties", or "all".',
         default="",
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="The number of processes to diff the retained elements with", default=1
+    )
+    parser.add_argument(
+        "-g",
+        "--geometry",
+        action="store_true",
+        help="Compare the tessellated geometry of elements with changed representations and report its magnitude",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=("json", "compact", "jsonl"),
+        help="Indented JSON, compact JSON, or JSON lines that are written while diffing. Defaults to json",
+        default="json",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted diff from the last checkpoint in the JSON lines output",
+    )
     args = parser.parse_args()
 
-    ifc_diff = IfcDiff(args.old, args.new, args.output, args.relationships.split())
+    if args.resume and args.format != "jsonl":
+        parser.error("--resume requires --format jsonl")
+
+    ifc_diff = IfcDiff(
+        args.old,
+        args.new,
+        args.output,
+        args.relationships.split(),
+        args.jobs,
+        args.geometry,
+        args.format,
+        args.resume,
+    )
     ifc_diff.diff()
     ifc_diff.export()
@@ -68,6 +68,9 @@
 #include <future>
 #include <thread>
 #include <chrono>
+#include <deque>
+#include <mutex>
+#include <condition_variable>
 
 #include <boost/algorithm/string.hpp>
 
@@ -185,6 +188,24 @@ namespace IfcGeom {
 		typename std::vector<IfcGeom::Element<P, PP>*>::const_iterator task_result_iterator_;
 		typename std::vector<IfcGeom::BRepElement<P, PP>*>::const_iterator native_task_result_iterator_;
 
+		// State for the streaming multi-threaded mode, in which worker threads convert
+		// at most settings.max_in_flight() tasks ahead of the consumer and elements are
+		// freed as soon as the consumer moves past the task that produced them.
+		bool streaming_;
+		std::vector<MAKE_TYPE_NAME(Kernel)*> stream_kernel_pool_;
+		std::vector<std::thread> stream_workers_;
+		std::mutex stream_mutex_;
+		std::condition_variable stream_slot_available_;
+		std::condition_variable stream_result_available_;
+		std::vector<char> stream_task_finished_;
+		std::deque<size_t> stream_finished_queue_;
+		size_t stream_next_task_;
+		size_t stream_consumed_tasks_;
+		size_t stream_current_task_;
+		size_t stream_current_element_;
+		bool stream_has_current_;
+		bool stream_abort_;
+
 		MAKE_TYPE_NAME(IteratorImplementation_)(const MAKE_TYPE_NAME(IteratorImplementation_)&); // N/I
 		MAKE_TYPE_NAME(IteratorImplementation_)& operator=(const MAKE_TYPE_NAME(IteratorImplementation_)&); // N/I
 
@@ -378,7 +399,12 @@ namespace IfcGeom {
 				done = 0;
 				total = representations->size();
 
-				if (num_threads_ != 1) {
+				if (num_threads_ != 1 && settings.max_in_flight() > 0) {
+					collect();
+					start_streaming();
+
+					initialization_outcome_ = stream_advance_();
+				} else if (num_threads_ != 1) {
 					collect();
 					process_concurrently();
 
@@ -494,6 +520,28 @@ namespace IfcGeom {
 				" objects)                                ");
 		}
 
+		void start_streaming() {
+			streaming_ = true;
+
+			size_t conc_threads = num_threads_;
+			if (conc_threads > tasks_.size()) {
+				conc_threads = tasks_.size();
+			}
+
+			stream_task_finished_.assign(tasks_.size(), 0);
+			stream_next_task_ = stream_consumed_tasks_ = 0;
+			stream_has_current_ = stream_abort_ = false;
+
+			Logger::ProgressBar(0);
+
+			stream_kernel_pool_.reserve(conc_threads);
+			stream_workers_.reserve(conc_threads);
+			for (unsigned i = 0; i < conc_threads; ++i) {
+				stream_kernel_pool_.push_back(new MAKE_TYPE_NAME(Kernel)(kernel));
+				stream_workers_.emplace_back(&MAKE_TYPE_NAME(IteratorImplementation_)::stream_worker_, this, stream_kernel_pool_.back());
+			}
+		}
+
         /// Computes model's bounding box (bounds_min and bounds_max).
         /// @note Can take several minutes for large files.
         void compute_bounds(bool with_geometry)
@@ -581,6 +629,115 @@ namespace IfcGeom {
         const gp_XYZ& bounds_max() const { return bounds_max_; }
 
 	private:
+		void stream_worker_(MAKE_TYPE_NAME(Kernel)* K) {
+			const size_t max_in_flight = settings.max_in_flight();
+			for (;;) {
+				size_t i;
+				{
+					std::unique_lock<std::mutex> lock(stream_mutex_);
+					// Tasks are claimed in order, so the task the consumer is waiting
+					// for in deterministic mode is always already claimed by a worker.
+					stream_slot_available_.wait(lock, [this, max_in_flight]() {
+						return stream_abort_ || stream_next_task_ == tasks_.size() || stream_next_task_ < stream_consumed_tasks_ + max_in_flight;
+					});
+					if (stream_abort_ || stream_next_task_ == tasks_.size()) {
+						return;
+					}
+					i = stream_next_task_++;
+				}
+
+				try {
+					create_element<P, PP>(K, settings, &tasks_[i]);
+				} catch (const std::exception& e) {
+					Logger::Error(e);
+				} catch (const Standard_Failure& e) {
+					if (e.GetMessageString() && strlen(e.GetMessageString())) {
+						Logger::Error(e.GetMessageString());
+					} else {
+						Logger::Error("Unknown error creating geometry");
+					}
+				} catch (...) {
+					Logger::Error("Unknown error creating geometry");
+				}
+
+				{
+					std::lock_guard<std::mutex> lock(stream_mutex_);
+					stream_task_finished_[i] = 1;
+					if (!settings.deterministic_order()) {
+						stream_finished_queue_.push_back(i);
+					}
+				}
+				stream_result_available_.notify_all();
+			}
+		}
+
+		// Frees the elements of the task the consumer currently points at and blocks until
+		// a next task with at least a single element is available. Returns false at the end.
+		bool stream_advance_() {
+			std::unique_lock<std::mutex> lock(stream_mutex_);
+			for (;;) {
+				if (stream_has_current_) {
+					free_task_(tasks_[stream_current_task_]);
+					stream_has_current_ = false;
+					++stream_consumed_tasks_;
+					stream_slot_available_.notify_all();
+
+					progress_ = (int) (stream_consumed_tasks_ * 100 / tasks_.size());
+				}
+
+				if (stream_consumed_tasks_ == tasks_.size()) {
+					return false;
+				}
+
+				if (settings.deterministic_order()) {
+					stream_result_available_.wait(lock, [this]() { return stream_task_finished_[stream_consumed_tasks_] != 0; });
+					stream_current_task_ = stream_consumed_tasks_;
+				} else {
+					stream_result_available_.wait(lock, [this]() { return !stream_finished_queue_.empty(); });
+					stream_current_task_ = stream_finished_queue_.front();
+					stream_finished_queue_.pop_front();
+				}
+
+				stream_has_current_ = true;
+				stream_current_element_ = 0;
+
+				if (!tasks_[stream_current_task_].elements.empty()) {
+					return true;
+				}
+			}
+		}
+
+		void free_task_(geometry_conversion_task<P, PP>& task) {
+			if (!settings.get(IfcGeom::IteratorSettings::DISABLE_TRIANGULATION)) {
+				for (auto& p : task.breps) {
+					delete p;
+				}
+			}
+			for (auto& p : task.elements) {
+				delete p;
+			}
+			task.breps.clear();
+			task.elements.clear();
+		}
+
+		void stop_streaming_() {
+			{
+				std::lock_guard<std::mutex> lock(stream_mutex_);
+				stream_abort_ = true;
+			}
+			stream_slot_available_.notify_all();
+
+			for (auto& t : stream_workers_) {
+				t.join();
+			}
+			for (auto& k : stream_kernel_pool_) {
+				delete k;
+			}
+			for (auto& t : tasks_) {
+				free_task_(t);
+			}
+		}
+
 		// Move to the next IfcRepresentation
 		void _nextShape() {
 			// In order to conserve memory and reduce cache insertion times, the cache is
@@ -786,7 +943,13 @@ namespace IfcGeom {
         /// Moves to the next shape representation, create its geometry, and returns the associated product.
         /// Use get() to retrieve the created geometry.
 		IfcUtil::IfcBaseClass* next() {
-			if (num_threads_ != 1) {
+			if (streaming_) {
+				if (++stream_current_element_ < tasks_[stream_current_task_].elements.size() || stream_advance_()) {
+					return tasks_[stream_current_task_].elements[stream_current_element_]->product();
+				} else {
+					return nullptr;
+				}
+			} else if (num_threads_ != 1) {
 				task_result_iterator_++;
 				native_task_result_iterator_++;
 				if (task_result_iterator_ == all_processed_elements_.end()) {
@@ -811,7 +974,9 @@ namespace IfcGeom {
             // TODO: Test settings and throw
             Element<P, PP>* ret = 0;
 
-			if (num_threads_ != 1) {
+			if (streaming_) {
+				ret = tasks_[stream_current_task_].elements[stream_current_element_];
+			} else if (num_threads_ != 1) {
 				ret = *task_result_iterator_;
 			} else {
 				if (current_triangulation) { 
@@ -872,11 +1037,33 @@ namespace IfcGeom {
             return ret;
         }
 
+		/// In streaming mode, takes the current element from its task and transfers its ownership
+		/// to the caller, so that it is not freed when the iterator advances. Returns nullptr if
+		/// the element has already been released or when not streaming, in which case elements
+		/// remain owned by the iterator until it is destroyed.
+		Element<P, PP>* release() {
+			if (!streaming_ || !tasks_[stream_current_task_].elements[stream_current_element_]) {
+				return nullptr;
+			}
+			Element<P, PP>* ret = get();
+			geometry_conversion_task<P, PP>& task = tasks_[stream_current_task_];
+			task.elements[stream_current_element_] = nullptr;
+			if (settings.get(IfcGeom::IteratorSettings::DISABLE_TRIANGULATION)) {
+				// The element is the brep itself
+				task.breps[stream_current_element_] = nullptr;
+			}
+			return ret;
+		}
+
+		bool is_streaming() const { return streaming_; }
+
 		/// Gets the native (Open Cascade) representation of the current geometrical entity.
 		BRepElement<P, PP>* get_native()
 		{
 			// TODO: Test settings and throw
-			if (num_threads_ != 1) {
+			if (streaming_) {
+				return tasks_[stream_current_task_].breps[stream_current_element_];
+			} else if (num_threads_ != 1) {
 				return *native_task_result_iterator_;
 			} else {
 				return current_shape_model;
@@ -992,6 +1179,8 @@ namespace IfcGeom {
 			current_shape_model = 0;
 			current_serialization = 0;
 
+			streaming_ = false;
+
 			unit_name = "METER";
 			unit_magnitude = 1.f;
 
@@ -1049,6 +1238,10 @@ namespace IfcGeom {
 		}
 
 		~MAKE_TYPE_NAME(IteratorImplementation_)() {
+			if (streaming_) {
+				stop_streaming_();
+			}
+
 			if (owns_ifc_file) {
 				delete ifc_file;
 			}
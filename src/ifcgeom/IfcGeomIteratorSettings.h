@@ -110,6 +110,8 @@ namespace IfcGeom
             : settings_(WELD_VERTICES) // OR options that default to true here
             , deflection_tolerance_(1.e-3)
 			, angular_tolerance_(0.5)
+			, max_in_flight_(0)
+			, deterministic_order_(true)
         {
         }
 
@@ -137,6 +139,22 @@ namespace IfcGeom
 			force_space_transparency_ = value;
 		}		
 
+		/// Maximum number of representations that are converted ahead of the consumer
+		/// when iterating with multiple threads. The default of 0 converts all
+		/// representations up front before the first element is returned.
+		size_t max_in_flight() const { return max_in_flight_; }
+		/// Whether elements are returned in file order when iterating with multiple
+		/// threads and max_in_flight() > 0, or otherwise in the order of completion.
+		bool deterministic_order() const { return deterministic_order_; }
+
+		void set_max_in_flight(size_t value) {
+			max_in_flight_ = value;
+		}
+
+		void set_deterministic_order(bool value) {
+			deterministic_order_ = value;
+		}
+
         /// Get boolean value for a single settings or for a combination of settings.
         bool get(SettingField setting) const
         {
@@ -163,6 +181,8 @@ namespace IfcGeom
     protected:
         SettingField settings_;
         double deflection_tolerance_, angular_tolerance_, force_space_transparency_;
+		size_t max_in_flight_;
+		bool deterministic_order_;
     };
 
     class IFC_GEOM_API ElementSettings : public IteratorSettings
@@ -133,6 +133,14 @@ namespace IfcGeom {
 
 		Element<P, PP>* get() { return implementation_->get(); }
 
+		/// In streaming mode, takes the current element from the iterator and transfers its
+		/// ownership to the caller, so that it remains valid after the iterator advances.
+		Element<P, PP>* release() { return implementation_->release(); }
+
+		/// Whether elements are freed as soon as the iterator advances past them, see
+		/// IteratorSettings::max_in_flight().
+		bool is_streaming() const { return implementation_->is_streaming(); }
+
 		BRepElement<P, PP>* get_native() { return implementation_->get_native(); }
 
 		const Element<P, PP>* get_object(int id) { return implementation_->get_object(id); }
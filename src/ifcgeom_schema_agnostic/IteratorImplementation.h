@@ -71,6 +71,8 @@ namespace IfcGeom {
 		virtual IfcParse::IfcFile* file() const = 0;
 		virtual IfcUtil::IfcBaseClass* next() = 0;
 		virtual Element<P, PP>* get() = 0;
+		virtual Element<P, PP>* release() = 0;
+		virtual bool is_streaming() const = 0;
 		virtual BRepElement<P, PP>* get_native() = 0;
 		virtual const Element<P, PP>* get_object(int id) = 0;
 		virtual IfcUtil::IfcBaseClass* create() = 0;
@@ -67,8 +67,26 @@ class SchemaError(Error):
     pass
 
 
-def open(fn):
-    f = ifcopenshell_wrapper.open(os.path.abspath(fn))
+def open(fn, mmap=False, num_threads=1, index=None):
+    """
+    Parses the IFC-SPF file at fn. With mmap=True the file is mapped into
+    memory rather than read into a private buffer, so that multiple processes
+    opening the same file share its pages. This requires IfcOpenShell to be
+    built with USE_MMAP, see ifcopenshell_wrapper.has_mmap().
+
+    With num_threads other than 1 the DATA section is split at instance
+    boundaries and indexed concurrently; num_threads < 1 uses all cores.
+
+    With index set to a filename, or True for fn + ".idx", the instance maps
+    are read from that binary sidecar file when it matches the size and
+    content hash of fn, rather than scanning the file. Instance attributes are
+    then parsed lazily on first access. A missing or outdated index is
+    rewritten after scanning.
+    """
+    if index is True:
+        index = fn + ".idx"
+    index = os.path.abspath(index) if index else ""
+    f = ifcopenshell_wrapper.open(os.path.abspath(fn), mmap, num_threads, index)
     if f.good():
         return file(f)
     else:
@@ -32,6 +32,18 @@ try:
 except ImportError as e:
     logging = type("logger", (object,), {"exception": staticmethod(lambda s: print(s))})
 
+INVALID, FORWARD, INVERSE = range(3)
+
+# Attribute lookups are cached per schema declaration, as they are the same for
+# all instances of an entity. Keyed by (schema declaration name, attribute name)
+# the cache holds the attribute category and index. Keyed by (schema declaration
+# name, attribute index) it holds the attribute type and the argument setter.
+_attribute_cache = {}
+_setter_cache = {}
+
+# Change trackers keyed by the address of the file they track, see file.track_changes()
+_change_trackers = {}
+
 
 class entity_instance(object):
     """This is the base Python class for all IFC objects.
@@ -53,13 +65,19 @@ class entity_instance(object):
             e = ifcopenshell_wrapper.new_IfcBaseClass(*e)
         super(entity_instance, self).__setattr__("wrapped_data", e)
 
+    def _get_attribute(self, name):
+        key = (self.wrapped_data.schema_declaration_name(), name)
+        attr = _attribute_cache.get(key)
+        if attr is None:
+            attr_cat = self.wrapped_data.get_attribute_category(name)
+            attr_idx = self.wrapped_data.get_argument_index(name) if attr_cat == FORWARD else None
+            attr = _attribute_cache[key] = attr_cat, attr_idx
+        return attr
+
     def __getattr__(self, name):
-        INVALID, FORWARD, INVERSE = range(3)
-        attr_cat = self.wrapped_data.get_attribute_category(name)
+        attr_cat, attr_idx = self._get_attribute(name)
         if attr_cat == FORWARD:
-            return entity_instance.wrap_value(
-                self.wrapped_data.get_argument(self.wrapped_data.get_argument_index(name))
-            )
+            return entity_instance.wrap_value(self.wrapped_data.get_argument(attr_idx))
         elif attr_cat == INVERSE:
             return entity_instance.wrap_value(self.wrapped_data.get_inverse(name))
         else:
@@ -116,18 +134,35 @@ class entity_instance(object):
         return self.wrapped_data.get_argument_name(attr_idx)
 
     def __setattr__(self, key, value):
-        self[self.wrapped_data.get_argument_index(key)] = value
+        attr_cat, attr_idx = self._get_attribute(key)
+        if attr_cat != FORWARD:
+            # Raises the appropriate error for inverse and non-existing attributes
+            attr_idx = self.wrapped_data.get_argument_index(key)
+        self[attr_idx] = value
 
     def __getitem__(self, key):
         if key < 0 or key >= len(self):
             raise IndexError("Attribute index {} out of range for instance of type {}".format(key, self.is_a()))
         return entity_instance.wrap_value(self.wrapped_data.get_argument(key))
 
+    def _get_setter(self, idx):
+        key = (self.wrapped_data.schema_declaration_name(), idx)
+        setter = _setter_cache.get(key)
+        if setter is None:
+            attr_type = real_attr_type = self.attribute_type(idx).title().replace(" ", "")
+            real_attr_type = real_attr_type.replace("Derived", "None")
+            attr_type = attr_type.replace("Binary", "String")
+            attr_type = attr_type.replace("Enumeration", "String")
+            fn = getattr(ifcopenshell_wrapper.entity_instance, "setArgumentAs%s" % attr_type, None)
+            setter = _setter_cache[key] = attr_type, real_attr_type, fn
+        return setter
+
     def __setitem__(self, idx, value):
-        attr_type = real_attr_type = self.attribute_type(idx).title().replace(" ", "")
-        real_attr_type = real_attr_type.replace("Derived", "None")
-        attr_type = attr_type.replace("Binary", "String")
-        attr_type = attr_type.replace("Enumeration", "String")
+        attr_type, real_attr_type, setter = self._get_setter(idx)
+
+        trackers = _change_trackers.get(self.wrapped_data.file_pointer()) if _change_trackers else None
+        if trackers:
+            old_value = entity_instance.wrap_value(self.wrapped_data.get_argument(idx))
 
         if value is None:
             if attr_type != "Derived":
@@ -143,9 +178,7 @@ class entity_instance(object):
 
                 try:
                     if attr_type != "Derived":
-                        getattr(self.wrapped_data, "setArgumentAs%s" % attr_type)(
-                            idx, entity_instance.unwrap_value(value)
-                        )
+                        setter(self.wrapped_data, idx, entity_instance.unwrap_value(value))
                 except BaseException as e:
                     valid = False
 
@@ -155,6 +188,10 @@ class entity_instance(object):
                     % (real_attr_type, self.is_a(), self.attribute_name(idx), value)
                 )
 
+        if trackers:
+            for tracker in trackers:
+                tracker.record_modified(self, old_value)
+
         return value
 
     def __len__(self):
@@ -26,6 +26,7 @@ import functools
 
 from . import ifcopenshell_wrapper
 from .entity_instance import entity_instance
+from .entity_instance import _change_trackers
 
 try:
     # Python 2
@@ -35,6 +36,62 @@ except NameError:
     basestring = (str, bytes)
 
 
+def instance_ids(value):
+    """Returns the ids of the instances in an attribute value"""
+    ids = []
+    entity_instance.walk(lambda v: isinstance(v, entity_instance), lambda v: ids.append(v.id()), value)
+    return ids
+
+
+class change_tracker(object):
+    """Records the ids of instances that are created, modified or removed in a file
+
+    Changes are recorded when they are made through the Python API, from the
+    moment the tracker is obtained from file.track_changes() until it is
+    closed. Instances that reference a removed instance, and from which the
+    reference is therefore removed, are recorded as modified. The ids in
+    neighbours are of instances that are no longer referenced by a modified
+    or removed instance, so their inverse attributes may have changed.
+    """
+
+    def __init__(self, ifc_file):
+        self.key = int(ifc_file.wrapped_data.this)
+        self.created = set()
+        self.modified = set()
+        self.removed = set()
+        self.neighbours = set()
+        _change_trackers.setdefault(self.key, []).append(self)
+
+    def record_created(self, inst):
+        self.created.add(inst.id())
+
+    def record_modified(self, inst, old_value):
+        self.modified.add(inst.id())
+        self.neighbours.update(instance_ids(old_value))
+
+    def record_removed(self, inst, references, inverses):
+        self.removed.add(inst.id())
+        self.created.discard(inst.id())
+        self.modified.discard(inst.id())
+        self.modified.update(e.id() for e in inverses)
+        self.neighbours.update(e.id() for e in references)
+
+    def reset(self):
+        """Clears the recorded changes, so that changes are recorded from this point onwards"""
+        self.created.clear()
+        self.modified.clear()
+        self.removed.clear()
+        self.neighbours.clear()
+
+    def close(self):
+        """Stops recording changes"""
+        trackers = _change_trackers.get(self.key, [])
+        if self in trackers:
+            trackers.remove(self)
+        if not trackers:
+            _change_trackers.pop(self.key, None)
+
+
 class file(object):
     """Base class for containing IFC files.
 
@@ -86,8 +143,31 @@ class file(object):
         attrs = list(enumerate(args)) + [(e.wrapped_data.get_argument_index(name), arg) for name, arg in kwargs.items()]
         for idx, arg in attrs:
             e[idx] = arg
+        for tracker in self.get_change_trackers():
+            tracker.record_created(e)
         return e
 
+    def get_change_trackers(self):
+        if not _change_trackers:
+            return []
+        return _change_trackers.get(int(self.wrapped_data.this), [])
+
+    def track_changes(self):
+        """Returns a tracker that records the ids of instances that are created, modified or removed
+
+        :returns: A change tracker, which should be closed when no longer needed
+        :rtype: ifcopenshell.file.change_tracker
+
+        Example::
+
+            tracker = ifc_file.track_changes()
+            ifc_file.createIfcWall()
+            print(tracker.created)
+            >>> {123}
+            tracker.close()
+        """
+        return change_tracker(self)
+
     def __getattr__(self, attr):
         if attr[0:6] == "create":
             return functools.partial(self.create_entity, attr[6:])
@@ -125,7 +205,14 @@ class file(object):
 
         If the entity already exists, it is not re-added."""
         inst.wrapped_data.this.disown()
-        return entity_instance(self.wrapped_data.add(inst.wrapped_data))
+        result = entity_instance(self.wrapped_data.add(inst.wrapped_data))
+        trackers = self.get_change_trackers()
+        if trackers:
+            # Instances referenced by inst are added as well
+            for e in self.traverse(result):
+                for tracker in trackers:
+                    tracker.record_created(e)
+        return result
 
     def by_type(self, type, include_subtypes=True):
         """Return IFC objects filtered by IFC Type and wrapped with the entity_instance class.
@@ -167,6 +254,31 @@ class file(object):
         """
         return [entity_instance(e) for e in self.wrapped_data.get_inverse(inst.wrapped_data)]
 
+    def get_attributes(self, instances, names):
+        """Return the values of several attributes for a list of entities in a single call
+
+        Attribute indices are resolved once per entity type rather than once for
+        every instance. Instances without an attribute of the requested name
+        receive None for that attribute.
+
+        :param instances: Entity instances or STEP numerical identifiers
+        :type instances: list
+        :param names: Forward or inverse attribute names
+        :type names: list
+        :returns: A dictionary with for every attribute name a list of values in the order of the instances
+        :rtype: dict
+
+        Example::
+
+            walls = ifc_file.by_type("IfcWall")
+            attributes = ifc_file.get_attributes(walls, ["GlobalId", "Name"])
+            print(attributes["Name"][0])
+            >>> Basic Wall:Generic - 200mm
+        """
+        instances = [i.wrapped_data if isinstance(i, entity_instance) else i for i in instances]
+        columns = ifcopenshell_wrapper.get_attributes_cpp(self.wrapped_data, instances, list(map(str, names)))
+        return {name: list(map(entity_instance.wrap_value, column)) for name, column in zip(names, columns)}
+
     def remove(self, inst):
         """Deletes an IFC object in the file.
 
@@ -178,6 +290,12 @@ class file(object):
         :type inst: ifcopenshell.entity_instance.entity_instance
         :rtype: None
         """
+        trackers = self.get_change_trackers()
+        if trackers:
+            references = self.traverse(inst, 1)[1:]
+            inverses = self.get_inverse(inst)
+            for tracker in trackers:
+                tracker.record_removed(inst, references, inverses)
         return self.wrapped_data.remove(inst.wrapped_data)
         
     def batch(self):
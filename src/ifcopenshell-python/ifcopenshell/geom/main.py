@@ -74,8 +74,52 @@ _iterator = ifcopenshell_wrapper.iterator_double_precision
 
 # Make sure people are able to use python's platform agnostic paths
 class iterator(_iterator):
-    def __init__(self, settings, file_or_filename, num_threads=1, include=None, exclude=None):
+    """
+    Iterates over the geometry of the products in a file.
+
+    With num_threads > 1 the elements are by default converted in advance
+    and kept in memory until the iterator is destroyed. When max_in_flight
+    is set, at most that many elements are kept in memory and every element
+    is freed as soon as the iterator advances past it. In that case the
+    element returned by get() is owned by the Python object, so it remains
+    valid after calling next(), but references to its geometry obtained from
+    the iterator in any other way (e.g. get_native()) do not. When streaming
+    and deterministic_order is False, elements are yielded in the order in
+    which their conversion finishes rather than in file order.
+
+    example:
+
+    iterator = ifcopenshell.geom.iterator(settings, ifc_file, multiprocessing.cpu_count(), max_in_flight=256)
+    shapes = list(iterator)
+    """
+
+    def __init__(
+        self,
+        settings,
+        file_or_filename,
+        num_threads=1,
+        include=None,
+        exclude=None,
+        max_in_flight=None,
+        deterministic_order=None,
+    ):
         self.settings = settings
+        self.batch_exhausted = False
+        self.current = None
+        # The iterator copies the settings, so the streaming options are
+        # only applied for its construction.
+        previous = settings.max_in_flight(), settings.deterministic_order()
+        if max_in_flight is not None:
+            settings.set_max_in_flight(max_in_flight)
+        if deterministic_order is not None:
+            settings.set_deterministic_order(deterministic_order)
+        try:
+            self._initialize(settings, file_or_filename, num_threads, include, exclude)
+        finally:
+            settings.set_max_in_flight(previous[0])
+            settings.set_deterministic_order(previous[1])
+
+    def _initialize(self, settings, file_or_filename, num_threads, include, exclude):
         if isinstance(file_or_filename, file):
             file_or_filename = file_or_filename.wrapped_data
         else:
@@ -110,10 +154,66 @@ class iterator(_iterator):
         else:
             _iterator.__init__(self, settings, file_or_filename, num_threads)
 
-    if has_occ:
+    def get(self):
+        if self.is_streaming():
+            # The element is freed by the iterator when it advances, so
+            # ownership is transferred once and the result is reused.
+            if self.current is None:
+                self.current = _iterator.release_(self)
+            shape = self.current
+        else:
+            shape = _iterator.get(self)
+        return wrap_shape_creation(self.settings, shape)
+
+    def next(self):
+        self.current = None
+        return _iterator.next(self)
+
+    def get_batch(self, n):
+        """
+        Return the triangulated geometry of up to n elements, starting at the
+        current element, and advance the iterator past them. Returns None when
+        the iterator is exhausted.
+
+        The result is a dictionary of flat NumPy arrays in which the data of
+        element i is found at e.g. verts[verts_offsets[i]:verts_offsets[i+1]].
+        Face, edge and material indices are local to every element. The
+        4x3 placement matrices are stored as rows of 12 values in matrices.
 
-        def get(self):
-            return wrap_shape_creation(self.settings, _iterator.get(self))
+        example:
+
+        iterator = ifcopenshell.geom.iterator(settings, ifc_file, multiprocessing.cpu_count())
+        if iterator.initialize():
+            while True:
+                batch = iterator.get_batch(1000)
+                if batch is None:
+                    break
+                print(len(batch["ids"]), batch["verts"].shape)
+        """
+        import numpy as np
+
+        if n < 1:
+            raise ValueError("n should be at least 1")
+
+        if self.batch_exhausted:
+            return None
+
+        batch = _iterator.get_batch_(self, n)
+        self.current = None
+        self.batch_exhausted = batch.pop("exhausted")
+
+        for key, value in batch.items():
+            if key == "guids":
+                continue
+            elif key in ("verts", "normals", "matrices"):
+                dtype = np.float64
+            elif key.endswith("_offsets"):
+                dtype = np.int64
+            else:
+                dtype = np.intc
+            batch[key] = np.frombuffer(value, dtype=dtype)
+        batch["matrices"] = batch["matrices"].reshape((-1, 12))
+        return batch
 
     def __iter__(self):
         if self.initialize():
@@ -21,6 +21,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 import uuid
 import string
 
@@ -55,3 +56,95 @@ def split(g):
 
 def new():
     return compress(uuid.uuid4().hex)
+
+
+def to_bytes(guids):
+    """Returns a (n, 16) uint8 array of the 32 character hexadecimal strings, 16 byte strings or array"""
+    import numpy as np
+
+    if isinstance(guids, np.ndarray):
+        return np.ascontiguousarray(guids, dtype=np.uint8).reshape(-1, 16)
+    guids = list(guids)
+    if guids and isinstance(guids[0], (bytes, bytearray)):
+        data = b"".join(guids)
+    else:
+        data = bytes.fromhex("".join(guids))
+    if len(data) != 16 * len(guids):
+        raise ValueError("Expected 16 bytes for every GUID")
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+
+
+def compress_many(guids):
+    """Compresses many GUIDs at once, equivalent to [compress(g) for g in guids]
+
+    :param guids: 32 character hexadecimal strings, 16 byte strings or a (n, 16) uint8 array
+    :returns: A list of 22 character compressed GUIDs
+    :rtype: list
+
+    NumPy is used when available to convert all GUIDs in a single pass.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [compress(g if isinstance(g, str) else bytes(g).hex()) for g in guids]
+
+    bs = to_bytes(guids)
+    # The first byte is encoded in two characters, every following 3 bytes in four characters of 6 bits
+    groups = bs[:, 1:].reshape(-1, 5, 3).astype(np.uint32)
+    groups = (groups[:, :, 0] << 16) | (groups[:, :, 1] << 8) | groups[:, :, 2]
+    values = np.empty((len(bs), 22), dtype=np.uint8)
+    values[:, 0] = bs[:, 0] >> 6
+    values[:, 1] = bs[:, 0] & 63
+    for i in range(4):
+        values[:, 2 + i :: 4] = (groups >> (6 * (3 - i))) & 63
+    table = np.frombuffer(chars.encode("ascii"), dtype=np.uint8)
+    data = table[values].tobytes().decode("ascii")
+    return [data[i : i + 22] for i in range(0, len(data), 22)]
+
+
+def expand_many(guids):
+    """Expands many compressed GUIDs at once, equivalent to [expand(g) for g in guids]
+
+    :param guids: 22 character compressed GUIDs
+    :returns: A list of 32 character hexadecimal strings
+    :rtype: list
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [expand(g) for g in guids]
+
+    guids = list(guids)
+    data = "".join(guids).encode("ascii")
+    if len(data) != 22 * len(guids):
+        raise ValueError("Expected 22 characters for every GUID")
+    table = np.full(256, 255, dtype=np.uint8)
+    table[np.frombuffer(chars.encode("ascii"), dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+    values = table[np.frombuffer(data, dtype=np.uint8)].reshape(-1, 22)
+    if (values == 255).any() or (values[:, 0] > 3).any():
+        raise ValueError("Invalid compressed GUID")
+    values = values.astype(np.uint32)
+    groups = (values[:, 2::4] << 18) | (values[:, 3::4] << 12) | (values[:, 4::4] << 6) | values[:, 5::4]
+    bs = np.empty((len(values), 16), dtype=np.uint8)
+    bs[:, 0] = (values[:, 0] << 6) | values[:, 1]
+    for i in range(3):
+        bs[:, 1 + i :: 3] = (groups >> (8 * (2 - i))) & 255
+    data = bs.tobytes().hex()
+    return [data[i : i + 32] for i in range(0, len(data), 32)]
+
+
+def new_many(n):
+    """Returns n new compressed GUIDs, equivalent to [new() for i in range(n)]
+
+    The GUIDs are random (version 4) UUIDs generated from a single call to os.urandom().
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [new() for i in range(n)]
+
+    bs = np.frombuffer(bytearray(os.urandom(16 * n)), dtype=np.uint8).reshape(-1, 16)
+    # Set the version and variant bits as uuid.uuid4() does
+    bs[:, 6] = (bs[:, 6] & 0x0F) | 0x40
+    bs[:, 8] = (bs[:, 8] & 0x3F) | 0x80
+    return compress_many(bs)
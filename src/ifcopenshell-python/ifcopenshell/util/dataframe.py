@@ -0,0 +1,107 @@
+import ifcopenshell
+import ifcopenshell.util.element
+from ifcopenshell.entity_instance import entity_instance
+
+
+def get_attribute_names(ifc_file, ifc_class):
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(ifc_file.schema)
+    return [a.name() for a in schema.declaration_by_name(ifc_class).all_attributes()]
+
+
+def to_identifiers(value):
+    # References to other instances are stored as their STEP id, so that columns only contain plain values
+    return entity_instance.walk(lambda v: isinstance(v, entity_instance), lambda v: v.id(), value)
+
+
+def get_property_columns(ifc_file, elements, properties=None):
+    """Returns a column for every property of the elements, named Pset.Prop
+
+    The property sets are read from the property index of the file, which
+    is built in a single pass over the relationships in the file, rather
+    than by querying the relationships of every element.
+
+    :param properties: If specified, the names of the Pset.Prop columns to return
+    """
+    index = ifcopenshell.util.element.get_pset_index(ifc_file)
+    wanted = set(properties) if properties is not None else None
+    columns = {name: [None] * len(elements) for name in properties or ()}
+    for i, element in enumerate(elements):
+        for pset_name, props in index.get(element.id(), {}).items():
+            for prop_name, value in props.items():
+                name = "{}.{}".format(pset_name, prop_name)
+                if wanted is not None and name not in wanted:
+                    continue
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * len(elements)
+                column[i] = value
+    return columns
+
+
+def get_columns(ifc_file, ifc_class, attributes=None, properties=None, include_subtypes=True):
+    """Returns a table of elements of a class as a dictionary of columns
+
+    The table has an id column, a column per direct attribute and a column
+    per property, named Pset.Prop. Every column is a list with a value for
+    every element. References to other instances are replaced by their id.
+
+    :param ifc_file: The IFC file
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The IFC class of the elements
+    :type ifc_class: string
+    :param attributes: The attribute names to include, by default all direct attributes of the class
+    :type attributes: list
+    :param properties: The Pset.Prop names to include, by default all properties
+    :type properties: list
+    :param include_subtypes: Whether or not to include elements of subclasses
+    :type include_subtypes: bool
+    :returns: A dictionary of column names and lists of values
+    :rtype: dict
+
+    Example::
+
+        columns = ifcopenshell.util.dataframe.get_columns(ifc_file, "IfcWall", ["GlobalId", "Name"])
+        print(columns["Pset_WallCommon.IsExternal"])
+        >>> [True, False, None]
+    """
+    elements = ifc_file.by_type(ifc_class, include_subtypes)
+    if attributes is None:
+        attributes = get_attribute_names(ifc_file, ifc_class)
+    columns = {"id": [element.id() for element in elements]}
+    for name, values in ifc_file.get_attributes(elements, attributes).items():
+        columns[name] = [to_identifiers(v) for v in values]
+    columns.update(get_property_columns(ifc_file, elements, properties))
+    return columns
+
+
+def get_dataframe(ifc_file, ifc_class, attributes=None, properties=None, include_subtypes=True):
+    """Returns a pandas DataFrame with the columns of get_columns(), requires pandas"""
+    import pandas
+
+    return pandas.DataFrame(get_columns(ifc_file, ifc_class, attributes, properties, include_subtypes))
+
+
+def get_arrays(ifc_file, ifc_class, attributes=None, properties=None, include_subtypes=True):
+    """Returns the columns of get_columns() as NumPy arrays, requires numpy
+
+    Columns of integers become integer arrays. Columns that only contain
+    numbers or None become float arrays with NaN for missing values. All other
+    columns become object arrays.
+    """
+    import numpy as np
+
+    def is_number(v):
+        return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+    arrays = {}
+    for name, values in get_columns(ifc_file, ifc_class, attributes, properties, include_subtypes).items():
+        if all(isinstance(v, int) and is_number(v) for v in values):
+            arrays[name] = np.array(values, dtype=np.int64)
+        elif all(v is None or is_number(v) for v in values):
+            arrays[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            # Assigned element-wise, as numpy would otherwise expand tuple values into a second dimension
+            arrays[name] = np.empty(len(values), dtype=object)
+            for i, v in enumerate(values):
+                arrays[name][i] = v
+    return arrays
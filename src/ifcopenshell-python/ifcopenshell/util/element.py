@@ -1,4 +1,7 @@
-def get_psets(element):
+def get_psets(element, ifc_file=None):
+    # When the file is provided, the property sets are read from its property index
+    if ifc_file is not None:
+        return {name: dict(props) for name, props in get_pset_index(ifc_file).get(element.id(), {}).items()}
     psets = {}
     try:
         if element.is_a("IfcTypeObject"):
@@ -18,6 +21,55 @@ def get_psets(element):
     return psets
 
 
+def get_pset_index(ifc_file):
+    """Returns the property sets of all elements in a file, indexed by element id
+
+    The index maps element ids to property set names to property names to
+    values. It is built in a single pass over the IfcRelDefinesByProperties
+    relationships and the property sets of type objects, and is stored on
+    the file. It is rebuilt when instances in the file have been added,
+    removed or modified since it was built. The returned dictionaries are
+    shared and should not be modified.
+
+    :param ifc_file: The IFC file
+    :type ifc_file: ifcopenshell.file.file
+    :returns: A dictionary of element ids and their property sets
+    :rtype: dict
+    """
+    modification_count = ifc_file.wrapped_data.modification_count()
+    index = ifc_file.__dict__.get("_pset_index")
+    if index is None or index[0] != modification_count:
+        index = ifc_file.__dict__["_pset_index"] = (modification_count, build_pset_index(ifc_file))
+    return index[1]
+
+
+def build_pset_index(ifc_file):
+    index = {}
+    definitions = {}
+
+    def get_definition(definition):
+        props = definitions.get(definition.id())
+        if props is None:
+            props = definitions[definition.id()] = get_property_definition(definition)
+        return props
+
+    for relationship in ifc_file.by_type("IfcRelDefinesByProperties"):
+        definition = relationship.RelatingPropertyDefinition
+        # IFC4 allows a set of property set definitions to be related at once
+        related_definitions = definition if isinstance(definition, tuple) else (definition,)
+        for element in relationship.RelatedObjects:
+            psets = index.setdefault(element.id(), {})
+            for definition in related_definitions:
+                if definition is not None:
+                    psets[definition.Name] = get_definition(definition)
+
+    for element in ifc_file.by_type("IfcTypeObject"):
+        if element.HasPropertySets:
+            index[element.id()] = {d.Name: get_definition(d) for d in element.HasPropertySets}
+
+    return index
+
+
 def get_property_definition(definition):
     if definition is not None:
         props = {}
@@ -1,6 +1,9 @@
+import itertools
+import ifcopenshell
 import ifcopenshell.util
 import ifcopenshell.util.element
 import lark
+from ifcopenshell.entity_instance import FORWARD
 
 cobie_type_assets = [
     "IfcDoorStyle",
@@ -58,106 +61,297 @@ cobie_component_assets = [
 ]
 
 
+grammar = """start: query (lfunction query)*
+    query: selector | group
+    group: "(" query (lfunction query)* ")"
+    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
+    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
+    class_selector: "." WORD filter ?
+    filter: "[" filter_key (comparison filter_value)? "]"
+    filter_key: WORD | pset_or_qto
+    filter_value: ESCAPED_STRING
+    pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
+    lfunction: and | or
+    inverse_relationship: types | contains_elements
+    types: "*"
+    contains_elements: "@"
+    and: "&"
+    or: "|"
+    comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
+    contains: "*="
+    morethanequalto: ">="
+    lessthanequalto: "<"
+    equal: "="
+    morethan: ">"
+    lessthan: "<"
+
+    // Embed common.lark for packaging
+    DIGIT: "0".."9"
+    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
+    INT: DIGIT+
+    SIGNED_INT: ["+"|"-"] INT
+    DECIMAL: INT "." INT? | "." INT
+    _EXP: ("e"|"E") SIGNED_INT
+    FLOAT: INT _EXP | DECIMAL _EXP?
+    SIGNED_FLOAT: ["+"|"-"] FLOAT
+    NUMBER: FLOAT | INT
+    SIGNED_NUMBER: ["+"|"-"] NUMBER
+    _STRING_INNER: /.*?/
+    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
+    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
+    LCASE_LETTER: "a".."z"
+    UCASE_LETTER: "A".."Z"
+    LETTER: UCASE_LETTER | LCASE_LETTER
+    WORD: LETTER+
+    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
+    WS_INLINE: (" "|/\\t/)+
+    WS: /[ \\t\\f\\r\\n]/+
+    CR : /\\r/
+    LF : /\\n/
+    NEWLINE: (CR? LF)+
+
+    %ignore WS // Disregard spaces in text
+"""
+
+# The grammar is compiled once, on first use
+parser = None
+
+# Query plans keyed by query string
+plans = {}
+max_plans = 1024
+
+
+def get_parser():
+    global parser
+    if parser is None:
+        parser = lark.Lark(grammar)
+    return parser
+
+
+def get_plan(query):
+    """Returns the query plan of a query, which is cached by query string
+
+    A plan is a tree of tuples, so that it can be used to look up the
+    results of subqueries that are shared between queries. A group is
+    ("group", ((lfunction, plan), ...)), a class selector is ("class",
+    class, filter, inverse_relationship) with a filter of (key, comparison,
+    value) and a guid selector is ("guid", guid, inverse_relationship).
+    """
+    plan = plans.get(query)
+    if plan is None:
+        if len(plans) >= max_plans:
+            plans.clear()
+        plan = plans[query] = compile_group(get_parser().parse(query))
+    return plan
+
+
+def compile_group(group):
+    lfunction = None
+    queries = []
+    for child in group.children:
+        if child.data == "query":
+            queries.append((lfunction, compile_query(child)))
+        elif child.data == "lfunction":
+            lfunction = str(child.children[0].data)
+    return ("group", tuple(queries))
+
+
+def compile_query(query):
+    for child in query.children:
+        if child.data == "selector":
+            return compile_selector(child)
+        elif child.data == "group":
+            return compile_group(child)
+
+
+def compile_selector(selector):
+    if len(selector.children) == 1:
+        inverse_relationship = None
+        class_or_guid_selector = selector.children[0]
+    else:
+        inverse_relationship = str(selector.children[0].children[0].data)
+        class_or_guid_selector = selector.children[1]
+
+    if class_or_guid_selector.data == "guid_selector":
+        return ("guid", str(class_or_guid_selector.children[0]), inverse_relationship)
+
+    filter_rule = None
+    if len(class_or_guid_selector.children) > 1 and class_or_guid_selector.children[1].data == "filter":
+        filter_rule = compile_filter(class_or_guid_selector.children[1])
+    return ("class", str(class_or_guid_selector.children[0]), filter_rule, inverse_relationship)
+
+
+def compile_filter(filter_rule):
+    key = filter_rule.children[0].children[0]
+    if not isinstance(key, str):
+        key = key.children[0] + "." + key.children[1]
+    comparison = value = None
+    if len(filter_rule.children) > 1:
+        comparison = str(filter_rule.children[1].children[0].data)
+        value = str(filter_rule.children[2].children[0][1:-1])
+    return (str(key), comparison, value)
+
+
 class Selector:
     def parse(self, ifc_file, query):
         self.file = ifc_file
+        self.results = {}
+        return list(self.get_results(get_plan(query)))
+
+    def parse_many(self, ifc_file, queries):
+        """Returns the results of several queries on the same file
+
+        The results of subqueries that occur in multiple queries, such as the
+        elements of a class or a filter on them, are only evaluated once.
+
+        :param ifc_file: The IFC file
+        :type ifc_file: ifcopenshell.file.file
+        :param queries: The selector queries
+        :type queries: list
+        :returns: A list of elements for every query
+        :rtype: list
+        """
+        self.file = ifc_file
+        self.results = {}
+        return [list(self.get_results(get_plan(query))) for query in queries]
+
+    def iter(self, ifc_file, query, limit=None):
+        """Yields the elements that match a query one by one
+
+        Elements are wrapped and filtered as they are read from the file, so
+        that no lists of candidate entity instances or filter results are
+        built, although the file still returns the handles of all instances of
+        a class at once. Elements are matched against the operands of an & by
+        testing the element itself, rather than by evaluating the operand on
+        the whole file. Only guid selectors and inverse relationships are
+        evaluated in full.
+
+        :param ifc_file: The IFC file
+        :type ifc_file: ifcopenshell.file.file
+        :param query: The selector query
+        :type query: string
+        :param limit: If specified, the maximum number of elements to yield
+        :type limit: int
+        :returns: A generator of elements
+        :rtype: generator
+
+        Example::
+
+            selector = ifcopenshell.util.selector.Selector()
+            for element in selector.iter(ifc_file, ".IfcWall[Name*=\"Exterior\"]", limit=10):
+                print(element.GlobalId)
+        """
+        self.file = ifc_file
+        self.results = {}
+        return itertools.islice(self.iter_results(get_plan(query)), limit)
+
+    def iter_results(self, plan):
+        if plan[0] == "group":
+            queries = plan[1]
+            needs_test = any(lfunction == "and" for lfunction, query in queries)
+            # Only the first operand and the operands of an | contribute elements
+            sources = [(i, query) for i, (lfunction, query) in enumerate(queries) if lfunction != "and"]
+            # A single source yields every element once
+            seen = set() if len(sources) > 1 else None
+            for i, query in sources:
+                for element in self.iter_results(query):
+                    if seen is not None:
+                        element_id = element.id()
+                        if element_id in seen:
+                            continue
+                        seen.add(element_id)
+                    if not needs_test or self.contains(plan, element, start=i + 1):
+                        yield element
+        elif plan[0] == "class" and not plan[-1]:
+            for element in self.iter_class_selector(plan[1], plan[2]):
+                yield element
+        else:
+            for element in self.get_results(plan):
+                yield element
+
+    def iter_class_selector(self, ifc_class, filter_rule, chunk_size=256):
+        if ifc_class in ("COBie", "COBieType"):
+            elements = iter(self.get_results(("class", ifc_class, None, None)))
+        else:
+            elements = (ifcopenshell.entity_instance(e) for e in self.file.wrapped_data.by_type(ifc_class))
+        if not filter_rule:
+            for element in elements:
+                yield element
+            return
+        # Filtered in chunks so that attribute values are still read in bulk
+        while True:
+            chunk = list(itertools.islice(elements, chunk_size))
+            if not chunk:
+                break
+            for element in self.filter_elements(chunk, filter_rule):
+                yield element
 
-        l = lark.Lark(
-            """start: query (lfunction query)*
-                    query: selector | group
-                    group: "(" query (lfunction query)* ")"
-                    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
-                    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
-                    class_selector: "." WORD filter ?
-                    filter: "[" filter_key (comparison filter_value)? "]"
-                    filter_key: WORD | pset_or_qto
-                    filter_value: ESCAPED_STRING
-                    pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
-                    lfunction: and | or
-                    inverse_relationship: types | contains_elements
-                    types: "*"
-                    contains_elements: "@"
-                    and: "&"
-                    or: "|"
-                    comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
-                    contains: "*="
-                    morethanequalto: ">="
-                    lessthanequalto: "<"
-                    equal: "="
-                    morethan: ">"
-                    lessthan: "<"
-
-                    // Embed common.lark for packaging
-                    DIGIT: "0".."9"
-                    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
-                    INT: DIGIT+
-                    SIGNED_INT: ["+"|"-"] INT
-                    DECIMAL: INT "." INT? | "." INT
-                    _EXP: ("e"|"E") SIGNED_INT
-                    FLOAT: INT _EXP | DECIMAL _EXP?
-                    SIGNED_FLOAT: ["+"|"-"] FLOAT
-                    NUMBER: FLOAT | INT
-                    SIGNED_NUMBER: ["+"|"-"] NUMBER
-                    _STRING_INNER: /.*?/
-                    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
-                    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
-                    LCASE_LETTER: "a".."z"
-                    UCASE_LETTER: "A".."Z"
-                    LETTER: UCASE_LETTER | LCASE_LETTER
-                    WORD: LETTER+
-                    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
-                    WS_INLINE: (" "|/\\t/)+
-                    WS: /[ \\t\\f\\r\\n]/+
-                    CR : /\\r/
-                    LF : /\\n/
-                    NEWLINE: (CR? LF)+
-
-                    %ignore WS // Disregard spaces in text
-                 """
-        )
-
-        start = l.parse(query)
-        return self.get_group(start)
-
-    def get_group(self, group):
-        lfunction = None
-        for child in group.children:
-            if child.data == "query":
-                new_results = self.get_query(child)
+    def contains(self, plan, element, start=None):
+        # If specified, the element is known to match the operands of a group up to start
+        if plan[0] == "group":
+            result = False
+            queries = plan[1]
+            if start is not None:
+                result = True
+                queries = queries[start:]
+            for lfunction, query in queries:
                 if not lfunction:
-                    results = new_results
+                    result = self.contains(query, element)
                 elif lfunction == "or":
-                    results.extend(new_results)
+                    result = result or self.contains(query, element)
                 elif lfunction == "and":
-                    results = list(set(results).intersection(new_results))
-                results = list(set(results))
-            elif child.data == "lfunction":
-                lfunction = child.children[0].data
+                    result = result and self.contains(query, element)
+            return result
+        elif plan[0] == "class" and not plan[-1]:
+            if plan[1] == "COBie":
+                is_class = any(element.is_a(c) for c in cobie_component_assets)
+            elif plan[1] == "COBieType":
+                is_class = any(element.is_a(c) for c in cobie_type_assets)
+            else:
+                is_class = element.is_a(plan[1])
+            return is_class and (not plan[2] or self.matches_filter(element, plan[2]))
+        # Guid selectors and inverse relationships are evaluated once and then looked up
+        results = self.results.get(("set", plan))
+        if results is None:
+            results = self.results[("set", plan)] = set(e.id() for e in self.get_results(plan))
+        return element.id() in results
+
+    def get_results(self, plan):
+        # The results are shared, callers should not modify them
+        results = self.results.get(plan)
+        if results is None:
+            results = self.results[plan] = self.evaluate(plan)
         return results
 
-    def get_query(self, query):
-        for child in query.children:
-            if child.data == "selector":
-                return self.get_selector(child)
-            elif child.data == "group":
-                return self.get_group(child)
-
-    def get_selector(self, selector):
-        if len(selector.children) == 1:
-            inverse_relationship = None
-            class_or_guid_selector = selector.children[0]
+    def evaluate(self, plan):
+        if plan[0] == "group":
+            return self.get_group(plan[1])
+        elif plan[0] == "guid":
+            results = self.get_guid_selector(plan[1])
         else:
-            inverse_relationship = selector.children[0]
-            class_or_guid_selector = selector.children[1]
-
-        if class_or_guid_selector.data == "class_selector":
-            results = self.get_class_selector(class_or_guid_selector)
-        elif class_or_guid_selector.data == "guid_selector":
-            results = self.get_guid_selector(class_or_guid_selector)
-
-        if not inverse_relationship:
+            results = self.get_class_selector(plan[1], plan[2])
+        if not plan[-1]:
             return results
-        return self.parse_inverse_relationship(results, inverse_relationship.children[0].data)
+        return self.parse_inverse_relationship(results, plan[-1])
+
+    def get_group(self, queries):
+        results = set()
+        for lfunction, query in queries:
+            if not lfunction:
+                results = set(self.get_results(query))
+            elif lfunction == "or":
+                results.update(self.get_results(query))
+            elif lfunction == "and" and results:
+                results.intersection_update(self.get_results(query))
+        # Ordered like iter(), by first occurrence in the operands that contribute elements
+        ordered = []
+        for lfunction, query in queries:
+            if lfunction != "and":
+                for element in self.get_results(query):
+                    if element in results:
+                        ordered.append(element)
+                        results.discard(element)
+        return ordered
 
     def parse_inverse_relationship(self, elements, inverse_relationship):
         results = []
@@ -172,15 +366,17 @@ class Selector:
                     results.extend(relationship.RelatedElements)
         return results
 
-    def get_class_selector(self, class_selector):
-        if class_selector.children[0] == "COBie":
+    def get_class_selector(self, ifc_class, filter_rule):
+        if filter_rule:
+            return self.filter_elements(self.get_results(("class", ifc_class, None, None)), filter_rule)
+        if ifc_class == "COBie":
             elements = []
             for ifc_class in cobie_component_assets:
                 try:
                     elements += self.file.by_type(ifc_class)
                 except:
                     pass
-        elif class_selector.children[0] == "COBieType":
+        elif ifc_class == "COBieType":
             elements = []
             for ifc_class in cobie_type_assets:
                 try:
@@ -188,28 +384,45 @@ class Selector:
                 except:
                     pass
         else:
-            elements = self.file.by_type(class_selector.children[0])
-        if len(class_selector.children) > 1 and class_selector.children[1].data == "filter":
-            return self.filter_elements(elements, class_selector.children[1])
+            elements = self.file.by_type(ifc_class)
         return elements
 
     def filter_elements(self, elements, filter_rule):
+        key, comparison, value = filter_rule
         results = []
-        key = filter_rule.children[0].children[0]
-        if not isinstance(key, str):
-            key = key.children[0] + "." + key.children[1]
-        comparison = value = None
-        if len(filter_rule.children) > 1:
-            comparison = filter_rule.children[1].children[0].data
-            value = filter_rule.children[2].children[0][1:-1]
-        for element in elements:
-            element_value = self.get_element_value(element, key)
+        for element, element_value in zip(elements, self.get_element_values(elements, key)):
             if element_value is None:
                 continue
             if not comparison or self.filter_element(element, element_value, comparison, value):
                 results.append(element)
         return results
 
+    def matches_filter(self, element, filter_rule):
+        key, comparison, value = filter_rule
+        element_value = self.get_element_value(element, key)
+        if element_value is None:
+            return False
+        return not comparison or self.filter_element(element, element_value, comparison, value)
+
+    def get_element_values(self, elements, key):
+        # Attributes and properties of the elements themselves are read in bulk
+        if key in ("id", "type") or key.split(".")[0] in ("type", "material", "container"):
+            return [self.get_element_value(element, key) for element in elements]
+        elif "." in key:
+            pset_name, prop = key.split(".")
+            index = ifcopenshell.util.element.get_pset_index(self.file)
+            return [index.get(element.id(), {}).get(pset_name, {}).get(prop) for element in elements]
+        values = self.file.get_attributes(elements, [key])[key]
+        # Like get_info(), only forward attributes are filtered on, while get_attributes() also reads inverses
+        is_forward = {}
+        for i, element in enumerate(elements):
+            declaration = element.wrapped_data.schema_declaration_name()
+            if declaration not in is_forward:
+                is_forward[declaration] = element.wrapped_data.get_attribute_category(key) == FORWARD
+            if not is_forward[declaration]:
+                values[i] = None
+        return values
+
     def get_element_value(self, element, key):
         if "." in key and key.split(".")[0] == "type":
             try:
@@ -235,12 +448,16 @@ class Selector:
             except:
                 return
             key = ".".join(key.split(".")[1:])
-        info = element.get_info()
-        if key in info:
-            return info[key]
-        elif "." in key:
+        if key == "id":
+            return element.id()
+        elif key == "type":
+            return element.is_a()
+        elif "." not in key:
+            if element.wrapped_data.get_attribute_category(key) == FORWARD:
+                return getattr(element, key)
+        else:
             pset_name, prop = key.split(".")
-            psets = ifcopenshell.util.element.get_psets(element)
+            psets = ifcopenshell.util.element.get_psets(element, self.file)
             if pset_name in psets and prop in psets[pset_name]:
                 return psets[pset_name][prop]
 
@@ -259,5 +476,5 @@ class Selector:
             return element_value <= float(value)
         return False
 
-    def get_guid_selector(self, guid_selector):
-        return [self.file.by_id(guid_selector.children[0])]
+    def get_guid_selector(self, guid):
+        return [self.file.by_id(guid)]
@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import re
 import sys
 import json
 import functools
@@ -113,7 +114,251 @@ def try_valid(attr, val, schema):
         return False
 
 
-def validate(f, logger):
+class recording_logger:
+    """Records the statements logged in a worker process, to be replayed in the main process"""
+
+    def __init__(self):
+        self.statements = []
+
+    def log(self, level, message, *args):
+        instance = getattr(self, "instance", None)
+        self.statements.append((instance, level, message, tuple(map(str, args))))
+
+    def error(self, message, *args):
+        self.log("error", message, *args)
+
+    def warning(self, message, *args):
+        self.log("warning", message, *args)
+
+
+class recording_instance_logger(recording_logger):
+    instance = None
+
+    def set_instance(self, instance):
+        self.instance = str(instance)
+
+
+# Checkers compiled from the schema, keyed by (schema name, declaration name)
+compiled_entities = {}
+compiled_types = {}
+type_ancestors = {}
+enumerations = {}
+
+
+def is_enumeration(schema, name):
+    key = schema.name(), name
+    result = enumerations.get(key)
+    if result is None:
+        result = enumerations[key] = isinstance(schema.declaration_by_name(name), enumeration_type)
+    return result
+
+
+def get_ancestors(schema, name):
+    """Returns the lower case names that val.is_a(name) is true for, for instances of the declaration"""
+    key = schema.name(), name
+    names = type_ancestors.get(key)
+    if names is None:
+        names = set()
+        decl = schema.declaration_by_name(name)
+        while decl is not None:
+            names.add(decl.name().lower())
+            if isinstance(decl, entity_type):
+                decl = decl.supertype()
+            elif isinstance(decl, type_declaration) and isinstance(decl.declared_type(), named_type):
+                decl = decl.declared_type().declared_type()
+            else:
+                decl = None
+        names = type_ancestors[key] = frozenset(names)
+    return names
+
+
+def get_select_leaves(attr_type):
+    """Returns the entities, type declarations and enumerations of a select, including those of nested selects"""
+    leaves = []
+    for x in attr_type.select_list():
+        if isinstance(x, select_type):
+            leaves.extend(get_select_leaves(x))
+        else:
+            leaves.append(x)
+    return leaves
+
+
+def unwrap_type(attr_type, type_wrappers):
+    while isinstance(attr_type, type_wrappers):
+        attr_type = attr_type.declared_type()
+    return attr_type
+
+
+def compile_checker(attr_type, schema):
+    """
+    Returns a function that, for a value of the type, returns whether it is valid. This is equivalent to
+    try_valid(attr_type, val, schema), except for aggregations with invalid elements, for which the
+    ValidationError of the element is raised. Declarations are compiled once per schema.
+    """
+    if isinstance(attr_type, (entity_type, type_declaration, select_type, enumeration_type)):
+        key = schema.name(), attr_type.name()
+        checker = compiled_types.get(key)
+        if checker is None:
+            checker = compiled_types[key] = compile_checker_(attr_type, schema)
+        return checker
+    return compile_checker_(attr_type, schema)
+
+
+def compile_checker_(attr_type, schema):
+    # Type declarations are only unwrapped for values that are not entity instances
+    instance_check = compile_unwrapped_checker(unwrap_type(attr_type, (named_type,)), schema)
+    value_type = unwrap_type(attr_type, (named_type, type_declaration))
+    if isinstance(value_type, (entity_type, select_type)):
+        value_check = instance_check
+    else:
+        value_check = compile_unwrapped_checker(value_type, schema)
+
+    def check(val):
+        if isinstance(val, ifcopenshell.entity_instance):
+            return instance_check(val)
+        return value_check(val)
+
+    return check
+
+
+def compile_unwrapped_checker(attr_type, schema):
+    if isinstance(attr_type, simple_type):
+        python_type = simple_type_python_mapping[attr_type.declared_type()]
+        return lambda val: type(val) == python_type
+    elif isinstance(attr_type, (entity_type, type_declaration)):
+        name = attr_type.name().lower()
+        return lambda val: isinstance(val, ifcopenshell.entity_instance) and name in get_ancestors(schema, val.is_a())
+    elif isinstance(attr_type, select_type):
+        leaves = get_select_leaves(attr_type)
+        names = frozenset(x.name().lower() for x in leaves if isinstance(x, (entity_type, type_declaration)))
+        value_checks = []
+
+        def check(val):
+            if isinstance(val, ifcopenshell.entity_instance):
+                is_a = val.is_a()
+                if not is_enumeration(schema, is_a):
+                    return not names.isdisjoint(get_ancestors(schema, is_a))
+                val = val.wrappedValue
+            if not value_checks:
+                value_checks.extend(compile_checker(x, schema) for x in leaves)
+            for value_check in value_checks:
+                try:
+                    if value_check(val):
+                        return True
+                except ValidationError:
+                    pass
+            return False
+
+        return check
+    elif isinstance(attr_type, enumeration_type):
+        items = frozenset(attr_type.enumeration_items())
+        return lambda val: val in items
+    elif isinstance(attr_type, aggregation_type):
+        b1, b2 = attr_type.bound1(), attr_type.bound2()
+        element_type = attr_type.type_of_element()
+        element_check = compile_checker(element_type, schema)
+
+        def check(val):
+            if len(val) < b1 or (b2 != -1 and len(val) > b2):
+                return False
+            for v in val:
+                if not element_check(v):
+                    raise ValidationError("%r not valid for %s" % (v, element_type))
+            return True
+
+        return check
+    else:
+
+        def check(val):
+            raise NotImplementedError("Not impl %s %s" % (type(attr_type), attr_type))
+
+        return check
+
+
+def compile_entity(schema, name):
+    key = schema.name(), name
+    compiled = compiled_entities.get(key)
+    if compiled is None:
+        entity = schema.declaration_by_name(name)
+        attributes = [
+            (attr, is_derived or attr.optional(), compile_checker(attr.type_of_attribute(), schema))
+            for attr, is_derived in zip(entity.all_attributes(), entity.derived())
+        ]
+        compiled = compiled_entities[key] = entity, entity.is_abstract(), attributes, entity.all_inverse_attributes()
+    return compiled
+
+
+def validate_instance(inst, schema, logger):
+    if hasattr(logger, "set_instance"):
+        logger.set_instance(inst)
+
+    entity, is_abstract, attributes, inverse_attributes = compile_entity(schema, inst.is_a())
+
+    if is_abstract:
+        e = "Entity %s is abstract" % entity.name()
+        if hasattr(logger, "set_instance"):
+            logger.error(e)
+        else:
+            logger.error("In %s\n%s", inst, e)
+
+    for (attr, is_optional, check), val in zip(attributes, inst):
+
+        if val is None and not is_optional:
+            logger.error("Attribute %s.%s not optional", entity, attr)
+
+        if val is not None:
+            try:
+                if not check(val):
+                    raise ValidationError("%r not valid for %s" % (val, attr))
+            except ValidationError as e:
+                if hasattr(logger, "set_instance"):
+                    logger.error(str(e))
+                else:
+                    logger.error("In %s\n%s", inst, e)
+
+    for attr in inverse_attributes:
+        val = getattr(inst, attr.name())
+        try:
+            assert_valid_inverse(attr, val, schema)
+        except ValidationError as e:
+            if hasattr(logger, "set_instance"):
+                logger.error(str(e))
+            else:
+                logger.error("In %s\n%s", inst, e)
+
+
+def validate_shard(args):
+    """Validates one of num_shards contiguous ranges of sorted instance ids in a worker process"""
+    filename, shard, num_shards, with_instance = args
+    f = ifcopenshell.open(filename, mmap=ifcopenshell.ifcopenshell_wrapper.has_mmap())
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
+    logger = recording_instance_logger() if with_instance else recording_logger()
+    ids = sorted(f.wrapped_data.entity_names())
+    for id in ids[len(ids) * shard // num_shards : len(ids) * (shard + 1) // num_shards]:
+        validate_instance(f[id], schema, logger)
+    return logger.statements
+
+
+def validate_concurrently(filename, logger, jobs):
+    import multiprocessing
+
+    with_instance = hasattr(logger, "set_instance")
+    pool = multiprocessing.Pool(jobs)
+    try:
+        shards = pool.map(validate_shard, [(filename, i, jobs, with_instance) for i in range(jobs)], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    # Statements are replayed in the order of the shards, i.e. by instance id
+    for statements in shards:
+        for instance, level, message, args in statements:
+            if with_instance:
+                logger.set_instance(instance)
+            getattr(logger, level)(message, *args)
+
+
+def validate(f, logger, jobs=1):
     """
     For an IFC population model `f` validate whether the entity attribute values are correctly supplied. As this
     is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
@@ -128,65 +373,103 @@ def validate(f, logger):
     to one of the leaves. For enumerations it is checked that the value is indeed on of the items. For aggregations it
     is checked that the elements and the cardinality conforms. Type declarations (IfcInteger which is an integer) are
     unpacked until one of the above cases is reached.
+
+    When jobs is larger than 1, `f` needs to be a filename. The instance ids are then split into contiguous ranges,
+    which are validated by a pool of worker processes that each open the file. The file is memory-mapped when
+    supported so that its pages are shared between the workers. The statements of the workers are passed to the
+    logger in order of instance id, with instances represented by their string representation.
     """
+    if jobs > 1:
+        if not isinstance(f, str):
+            raise ValueError("Validating with multiple jobs requires a filename")
+        return validate_concurrently(f, logger, jobs)
+
+    if isinstance(f, str):
+        f = ifcopenshell.open(f)
+
     schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
     for inst in f:
-        if hasattr(logger, "set_instance"):
-            logger.set_instance(inst)
+        validate_instance(inst, schema, logger)
 
-        entity = schema.declaration_by_name(inst.is_a())
 
-        if entity.is_abstract():
-            e = "Entity %s is abstract" % entity.name()
-            if hasattr(logger, "set_instance"):
-                logger.error(e)
-            else:
-                logger.error("In %s\n%s", inst, e)
+def get_statement_instance_id(statement):
+    """Returns the id of the instance of a json_logger statement, stored as its string representation"""
+    match = re.match(r"#(\d+)=", str(statement.get("instance")))
+    return int(match.group(1)) if match else None
+
 
-        for attr, val, is_derived in zip(entity.all_attributes(), inst, entity.derived()):
+def validate_changes(f, tracker, previous=()):
+    """
+    Revalidates the instances recorded by a change tracker, obtained from `f.track_changes()`, since it was created
+    or last reset. This includes the instances that were created or modified, as well as the instances that they
+    reference or are referenced by, or used to reference, as the cardinality of their inverse attributes may have
+    changed. These are validated in full.
+
+    Returns the statements of a `json_logger` for the revalidated instances merged with the `previous` statements of
+    a json_logger, for example a report of the whole file read back from JSON lines. Previous statements about
+    revalidated or removed instances are replaced. The tracker is then reset, so that it records the changes since
+    this checkpoint.
+
+    Instances in the returned statements are stored as their string representation, as they would be in JSON, because
+    they may since have been removed from the file. For the same reason, `previous` statements need to store instances
+    as strings rather than entity instances.
+    """
+    previous = list(previous)
+    if any(isinstance(s.get("instance"), ifcopenshell.entity_instance) for s in previous):
+        raise ValueError("Previous statements need to store instances as their string representation")
 
-            if val is None and not (is_derived or attr.optional()):
-                logger.error("Attribute %s.%s not optional", entity, attr)
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
 
-            if val is not None:
-                attr_type = attr.type_of_attribute()
-                try:
-                    assert_valid(attr, val, schema)
-                except ValidationError as e:
-                    if hasattr(logger, "set_instance"):
-                        logger.error(str(e))
-                    else:
-                        logger.error("In %s\n%s", inst, e)
-
-        for attr in entity.all_inverse_attributes():
-            val = getattr(inst, attr.name())
-            try:
-                assert_valid_inverse(attr, val, schema)
-            except ValidationError as e:
-                if hasattr(logger, "set_instance"):
-                    logger.error(str(e))
-                else:
-                    logger.error("In %s\n%s", inst, e)
+    changed = (tracker.created | tracker.modified) - tracker.removed
+    ids = set(changed) | tracker.neighbours
+    for id in changed:
+        try:
+            inst = f.by_id(id)
+        except RuntimeError:
+            continue
+        ids.update(e.id() for e in f.traverse(inst, 1))
+        ids.update(e.id() for e in f.get_inverse(inst))
+    # Type declaration instances in attribute values do not have an id
+    ids -= tracker.removed | {0}
+
+    logger = json_logger()
+    for id in sorted(ids):
+        try:
+            inst = f.by_id(id)
+        except RuntimeError:
+            continue
+        validate_instance(inst, schema, logger)
+    for statement in logger.statements:
+        statement["instance"] = str(statement["instance"])
+
+    replaced = ids | tracker.removed
+    statements = [s for s in previous if get_statement_instance_id(s) not in replaced] + logger.statements
+    statements.sort(key=lambda s: get_statement_instance_id(s) or 0)
+
+    tracker.reset()
+    return statements
 
 
 if __name__ == "__main__":
     import sys
     import logging
+    import argparse
 
-    filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
-    flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    parser = argparse.ArgumentParser(description="Validate the attribute values of IFC files against their schema")
+    parser.add_argument("--json", action="store_true", help="Output the log as JSON lines")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes to validate with")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
 
-    for fn in filenames:
-        if "--json" in flags:
+    for fn in args.files:
+        if args.json:
             logger = json_logger()
         else:
             logger = logging.getLogger("validate")
             logger.setLevel(logging.DEBUG)
 
-        f = ifcopenshell.open(fn)
-
         print("Validating", fn, file=sys.stderr)
-        validate(f, logger)
+        validate(fn, logger, jobs=args.jobs)
 
-        if "--json" in flags:
+        if args.json:
             print("\n".join(json.dumps(x, default=str) for x in logger.statements))
@@ -67,10 +67,10 @@ public:
 /// and provide access to the entities in an IFC file
 class IFC_PARSE_API IfcFile {
 public:
-	typedef std::map<const IfcParse::declaration*, IfcEntityList::ptr> entities_by_type_t;
+	typedef boost::unordered_map<const IfcParse::declaration*, IfcEntityList::ptr> entities_by_type_t;
 	typedef boost::unordered_map<unsigned int, IfcUtil::IfcBaseClass*> entity_by_id_t;
-	typedef std::map<std::string, IfcUtil::IfcBaseClass*> entity_by_guid_t;
-	typedef std::map<unsigned int, std::vector<unsigned int> > entities_by_ref_t;
+	typedef boost::unordered_map<std::string, IfcUtil::IfcBaseClass*> entity_by_guid_t;
+	typedef boost::unordered_map<unsigned int, std::vector<unsigned int> > entities_by_ref_t;
 	typedef std::map<unsigned int, IfcEntityList::ptr> ref_map_t;
 	typedef entity_by_id_t::const_iterator const_iterator;
 
@@ -119,6 +119,7 @@ private:
 	entities_by_type_t bytype_excl;
 	entities_by_ref_t byref;
 	ref_map_t by_ref_cached_;
+	unsigned int modification_count_ = 0;
 	entity_by_guid_t byguid;
 	entity_entity_map_t entity_file_map;
 
@@ -128,7 +129,14 @@ private:
 
 	void setDefaultHeaderValues();
 
-	void initialize_(IfcParse::IfcSpfStream* f);
+	void initialize_(IfcParse::IfcSpfStream* f, int num_threads = 1, const std::string& index_filename = "");
+
+	void scan_();
+	void scan_concurrently_(unsigned int data_offset, int num_threads);
+	void register_scanned_instance_(unsigned int id, IfcUtil::IfcBaseClass* instance);
+	void register_scanned_guid_(const std::string& guid, IfcUtil::IfcBaseClass* instance);
+	bool load_index_(const std::string& index_filename);
+	void write_index_(const std::string& index_filename) const;
 
 	void build_inverses_(IfcUtil::IfcBaseClass*);
 
@@ -147,7 +155,12 @@ public:
 #endif
 	IfcFile(std::istream& fn, int len);
 	IfcFile(void* data, int len);
-	IfcFile(IfcParse::IfcSpfStream* f);
+	/// With num_threads other than 1 the DATA section is split at instance boundaries
+	/// and the chunks are scanned concurrently, num_threads < 1 uses all hardware threads.
+	/// When an index_filename is provided and the index matches the size and content of
+	/// the file, the maps are read from the index instead of scanning the DATA section.
+	/// Otherwise the index is (re)written after scanning.
+	IfcFile(IfcParse::IfcSpfStream* f, int num_threads = 1, const std::string& index_filename = "");
 	IfcFile(const IfcParse::schema_definition* schema = IfcParse::schema_by_name("IFC4"));
 
 	virtual ~IfcFile();
@@ -226,6 +239,10 @@ public:
 	/// @todo Currently the whole cache is invalidated. Implement more fine-grained invalidation.
 	void mark_entity_as_modified(int id);
 
+	/// Returns a number that is incremented whenever instances are added, removed or
+	/// modified, so that caches derived from the file contents can be invalidated.
+	unsigned int modification_count() const { return modification_count_; }
+
 	unsigned int FreshId() { return ++MaxId; }
 
 	IfcUtil::IfcBaseClass* addEntity(IfcUtil::IfcBaseClass* entity);
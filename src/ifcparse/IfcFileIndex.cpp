@@ -0,0 +1,329 @@
+/********************************************************************************
+ *                                                                              *
+ * This file is part of IfcOpenShell.                                           *
+ *                                                                              *
+ * IfcOpenShell is free software: you can redistribute it and/or modify         *
+ * it under the terms of the Lesser GNU General Public License as published by  *
+ * the Free Software Foundation, either version 3.0 of the License, or          *
+ * (at your option) any later version.                                          *
+ *                                                                              *
+ * IfcOpenShell is distributed in the hope that it will be useful,              *
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of               *
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the                 *
+ * Lesser GNU General Public License for more details.                          *
+ *                                                                              *
+ * You should have received a copy of the Lesser GNU General Public License     *
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.         *
+ *                                                                              *
+ ********************************************************************************/
+
+/********************************************************************************
+ *                                                                              *
+ * A binary sidecar index of the maps that are built by scanning the DATA       *
+ * section of an IFC-SPF file. When the index matches the size and content      *
+ * hash of the file, the instances are created directly from the stored         *
+ * instance names, types and offsets and their attributes are parsed lazily.    *
+ *                                                                              *
+ * All integers are stored in native byte order as 32 or 64 bit values:        *
+ *   magic, version, file size, content hash, schema name                       *
+ *   number of types, type names                                                *
+ *   number of instances, (instance name, type index, offset) in file order     *
+ *   number of guids, (instance name, guid)                                     *
+ *   number of referenced instances, (instance name, n, n referencing names)    *
+ * Strings are stored as their length followed by the characters.               *
+ *                                                                              *
+ ********************************************************************************/
+
+#include "../ifcparse/IfcFile.h"
+#include "../ifcparse/IfcSpfStream.h"
+#include "../ifcparse/IfcLogger.h"
+#include "../ifcparse/utils.h"
+
+#include <cstdio>
+#include <cstdint>
+#include <cstring>
+#include <ctime>
+#include <algorithm>
+
+using namespace IfcParse;
+
+namespace {
+	static const char index_magic[8] = { 'I', 'F', 'C', 'I', 'D', 'X', 0, 0 };
+	static const uint32_t index_version = 2;
+
+	inline uint64_t mix(uint64_t h, uint64_t w) {
+		h = (h ^ w) * 1099511628211ULL;
+		return h ^ (h >> 29);
+	}
+
+	// 64 bit hash of the file contents, computed directly over the buffer in blocks of
+	// four independent 64 bit words, so that it runs at close to memory bandwidth.
+	//
+	// All of the file is hashed rather than a sample of it (such as the head, the tail and
+	// the size), because edits that keep the size of a file, such as a changed GlobalId or
+	// coordinate, are common and would go unnoticed and leave a stale index in use. The
+	// trade-off is one sequential pass over the file, which pages in all of a memory mapped
+	// file before the index is used.
+	uint64_t content_hash(IfcSpfStream* stream) {
+		const char* data = stream->Data();
+		const size_t n = stream->size;
+		uint64_t lanes[4] = { 14695981039346656037ULL, 0x9e3779b97f4a7c15ULL, 0xc2b2ae3d27d4eb4fULL, 0x165667b19e3779f9ULL };
+		size_t i = 0;
+		for (; i + sizeof(lanes) <= n; i += sizeof(lanes)) {
+			for (size_t j = 0; j < 4; ++j) {
+				uint64_t w;
+				memcpy(&w, data + i + j * sizeof(uint64_t), sizeof(uint64_t));
+				lanes[j] = mix(lanes[j], w);
+			}
+		}
+		uint64_t h = lanes[0];
+		for (size_t j = 1; j < 4; ++j) {
+			h = mix(h, lanes[j]);
+		}
+		for (; i < n; ++i) {
+			h = mix(h, (unsigned char) data[i]);
+		}
+		return mix(h, n);
+	}
+
+	FILE* open_file(const std::string& fn, bool write) {
+#ifdef _MSC_VER
+		std::wstring fn_ws = IfcUtil::path::from_utf8(fn);
+		return _wfopen(fn_ws.c_str(), write ? L"wb" : L"rb");
+#else
+		return fopen(fn.c_str(), write ? "wb" : "rb");
+#endif
+	}
+
+	class index_reader {
+		FILE* f_;
+		uint32_t max_count_;
+	public:
+		bool good;
+
+		index_reader(FILE* f, uint32_t max_count) : f_(f), max_count_(max_count), good(f != nullptr) {}
+
+		// Reads the size of a sequence, which can never exceed the size of the IFC file
+		uint32_t read_count() {
+			uint32_t n = read<uint32_t>();
+			if (n > max_count_) {
+				good = false;
+				n = 0;
+			}
+			return n;
+		}
+
+		template <typename T>
+		T read() {
+			T v = T();
+			good = good && fread(&v, sizeof(T), 1, f_) == 1;
+			return v;
+		}
+
+		template <typename T>
+		void read(std::vector<T>& vs, size_t n) {
+			vs.resize(n);
+			good = good && (n == 0 || fread(vs.data(), sizeof(T), n, f_) == n);
+		}
+
+		std::string read_string() {
+			std::string s(read_count(), ' ');
+			good = good && (s.empty() || fread(&s[0], 1, s.size(), f_) == s.size());
+			return s;
+		}
+	};
+
+	class index_writer {
+		FILE* f_;
+	public:
+		bool good;
+
+		index_writer(FILE* f) : f_(f), good(f != nullptr) {}
+
+		template <typename T>
+		void write(const T& v) {
+			good = good && fwrite(&v, sizeof(T), 1, f_) == 1;
+		}
+
+		template <typename T>
+		void write(const std::vector<T>& vs) {
+			good = good && (vs.empty() || fwrite(vs.data(), sizeof(T), vs.size(), f_) == vs.size());
+		}
+
+		void write_string(const std::string& s) {
+			write((uint32_t) s.size());
+			good = good && (s.empty() || fwrite(s.data(), 1, s.size(), f_) == s.size());
+		}
+	};
+
+	struct index_instance {
+		uint32_t id;
+		uint32_t type;
+		uint32_t offset;
+	};
+}
+
+bool IfcFile::load_index_(const std::string& index_filename) {
+	FILE* f = open_file(index_filename, false);
+	if (f == nullptr) {
+		return false;
+	}
+
+	index_reader r(f, stream->size);
+
+	char magic[sizeof(index_magic)];
+	r.good = fread(magic, 1, sizeof(magic), f) == sizeof(magic) && std::equal(magic, magic + sizeof(magic), index_magic);
+
+	const bool matches = r.good &&
+		r.read<uint32_t>() == index_version &&
+		r.read<uint64_t>() == stream->size &&
+		r.read<uint64_t>() == content_hash(stream) &&
+		r.read_string() == schema_->name() &&
+		r.good;
+
+	if (!matches) {
+		fclose(f);
+		Logger::Notice("Index " + index_filename + " is out of date");
+		return false;
+	}
+
+	// Read everything before populating the maps so that a truncated or corrupt index
+	// leaves the file untouched and the DATA section is scanned instead.
+	std::vector<const IfcParse::declaration*> types(r.read_count());
+	for (auto& t : types) {
+		const std::string name = r.read_string();
+		try {
+			t = schema_->declaration_by_name(name);
+		} catch (const IfcException&) {
+			r.good = false;
+		}
+		if (!r.good) {
+			break;
+		}
+	}
+
+	std::vector<index_instance> instances;
+	r.read(instances, r.read_count());
+
+	std::vector<std::pair<uint32_t, std::string> > guids(r.read_count());
+	for (auto& g : guids) {
+		g.first = r.read<uint32_t>();
+		g.second = r.read_string();
+		if (!r.good) {
+			break;
+		}
+	}
+
+	std::vector<std::pair<uint32_t, std::vector<uint32_t> > > references(r.read_count());
+	for (auto& ref : references) {
+		ref.first = r.read<uint32_t>();
+		r.read(ref.second, r.read_count());
+		if (!r.good) {
+			break;
+		}
+	}
+
+	fclose(f);
+
+	if (!r.good || std::any_of(instances.begin(), instances.end(), [&types](const index_instance& i) { return i.type >= types.size(); })) {
+		Logger::Warning("Index " + index_filename + " is corrupt");
+		return false;
+	}
+
+	byid.reserve(instances.size());
+	byguid.reserve(guids.size());
+	byref.reserve(references.size());
+
+	for (auto& i : instances) {
+		IfcEntityInstanceData* data = new IfcEntityInstanceData(types[i.type], this, i.id, i.offset);
+		register_scanned_instance_(i.id, schema_->instantiate(data));
+	}
+
+	for (auto& g : guids) {
+		entity_by_id_t::const_iterator it = byid.find(g.first);
+		if (it != byid.end()) {
+			byguid[g.second] = it->second;
+		}
+	}
+
+	for (auto& ref : references) {
+		byref[ref.first].assign(ref.second.begin(), ref.second.end());
+	}
+
+	Logger::Status("Read index " + index_filename);
+
+	return true;
+}
+
+void IfcFile::write_index_(const std::string& index_filename) const {
+	std::vector<IfcUtil::IfcBaseClass*> instances;
+	instances.reserve(byid.size());
+	for (auto& p : byid) {
+		instances.push_back(p.second);
+	}
+	// The instance lists by type are populated in file order
+	std::sort(instances.begin(), instances.end(), [](IfcUtil::IfcBaseClass* a, IfcUtil::IfcBaseClass* b) {
+		return a->data().offset_in_file() < b->data().offset_in_file();
+	});
+
+	std::map<const IfcParse::declaration*, uint32_t> type_indices;
+	std::vector<std::string> type_names;
+	std::vector<index_instance> records;
+	records.reserve(instances.size());
+	for (auto& inst : instances) {
+		const IfcParse::declaration* decl = &inst->declaration();
+		auto it = type_indices.find(decl);
+		if (it == type_indices.end()) {
+			it = type_indices.insert({ decl, (uint32_t) type_names.size() }).first;
+			type_names.push_back(decl->name());
+		}
+		records.push_back({ inst->data().id(), it->second, inst->data().offset_in_file() });
+	}
+
+	// Write to a temporary file first, so that concurrent readers never observe a partial index
+	std::string temp_filename = index_filename + "." + std::to_string(std::time(nullptr)) + "." + std::to_string((size_t) this) + ".tmp";
+	FILE* f = open_file(temp_filename, true);
+
+	index_writer w(f);
+	w.good = w.good && fwrite(index_magic, 1, sizeof(index_magic), f) == sizeof(index_magic);
+	w.write(index_version);
+	w.write((uint64_t) stream->size);
+	w.write(content_hash(stream));
+	w.write_string(schema_->name());
+
+	w.write((uint32_t) type_names.size());
+	for (auto& name : type_names) {
+		w.write_string(name);
+	}
+
+	w.write((uint32_t) records.size());
+	w.write(records);
+
+	w.write((uint32_t) byguid.size());
+	for (auto& p : byguid) {
+		w.write((uint32_t) p.second->data().id());
+		w.write_string(p.first);
+	}
+
+	w.write((uint32_t) byref.size());
+	for (auto& p : byref) {
+		w.write((uint32_t) p.first);
+		w.write((uint32_t) p.second.size());
+		w.write(p.second);
+	}
+
+	if (f) {
+		w.good = fclose(f) == 0 && w.good;
+	}
+
+	if (w.good) {
+		// On Windows rename() does not replace existing files
+		std::remove(index_filename.c_str());
+		w.good = std::rename(temp_filename.c_str(), index_filename.c_str()) == 0;
+	}
+
+	if (!w.good) {
+		std::remove(temp_filename.c_str());
+		Logger::Warning("Unable to write index " + index_filename);
+	}
+}
@@ -34,6 +34,7 @@
 #include <set>
 #include <ctime>
 #include <mutex>
+#include <thread>
 #include <string>
 #include <stdio.h>
 #include <stdlib.h>
@@ -151,7 +152,8 @@ IfcSpfStream::IfcSpfStream(const std::string& fn)
 		valid = true;
 		buffer = mfs.data();
 		ptr = 0;
-		len = mfs.size();
+		size = len = (unsigned int)mfs.size();
+		eof = len == 0;
 	} else {
 #endif
 		if (stream == NULL) {
@@ -199,12 +201,27 @@ IfcSpfStream::IfcSpfStream(void* data, int l)
 	len = l;
 }
 
+IfcSpfStream::IfcSpfStream(IfcSpfStream* parent, unsigned int begin, unsigned int end)
+	: stream(0)
+	, buffer(parent->buffer)
+	, ptr(begin)
+	, len(end)
+	, owns_buffer(false)
+{
+	eof = begin >= end;
+	size = end - begin;
+	valid = parent->valid;
+}
+
 IfcSpfStream::~IfcSpfStream()
 {
 	Close();
 }
 
 void IfcSpfStream::Close() {
+	if (!owns_buffer) {
+		return;
+	}
 #ifdef USE_MMAP
 	if (mfs.is_open()) {
 		mfs.close();
@@ -237,6 +254,13 @@ char IfcSpfStream::Read(unsigned int o) {
 	return buffer[o];
 }
 
+//
+// Returns the buffer that holds the file contents
+//
+const char* IfcSpfStream::Data() {
+	return buffer;
+}
+
 //
 // Returns the cursor position
 //
@@ -1320,8 +1344,8 @@ IfcFile::IfcFile(void* data, int len) {
 	initialize_(new IfcSpfStream(data, len));
 }
 
-IfcFile::IfcFile(IfcParse::IfcSpfStream* s) {
-	initialize_(s);
+IfcFile::IfcFile(IfcParse::IfcSpfStream* s, int num_threads, const std::string& index_filename) {
+	initialize_(s, num_threads, index_filename);
 }
 
 IfcFile::IfcFile(const IfcParse::schema_definition* schema)
@@ -1335,7 +1359,7 @@ IfcFile::IfcFile(const IfcParse::schema_definition* schema)
 	setDefaultHeaderValues();
 }
 
-void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
+void IfcFile::initialize_(IfcParse::IfcSpfStream* s, int num_threads, const std::string& index_filename) {
 	// Initialize a "C" locale for locale-independent
 	// number parsing. See comment above on line 41.
 	init_locale();
@@ -1386,6 +1410,25 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 
 	ifcroot_type_ = schema_->declaration_by_name("IfcRoot");
 
+	if (!index_filename.empty() && load_index_(index_filename)) {
+		parsing_complete_ = true;
+		return;
+	}
+
+	if (num_threads != 1) {
+		scan_concurrently_(stream->Tell(), num_threads < 1 ? (int) std::thread::hardware_concurrency() : num_threads);
+	}
+
+	if (!parsing_complete_) {
+		scan_();
+	}
+
+	if (!index_filename.empty()) {
+		write_index_(index_filename);
+	}
+}
+
+void IfcFile::scan_() {
 	boost::circular_buffer<Token> token_stream(3, Token());
 
 	IfcEntityInstanceData* data;
@@ -1422,52 +1465,13 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 
 			if (instance->declaration().is(*ifcroot_type_)) {
 				try {
-					const std::string guid = *instance->data().getArgument(0);
-					if ( byguid.find(guid) != byguid.end() ) {
-						std::stringstream ss;
-						ss << "Instance encountered with non-unique GlobalId " << guid;
-						Logger::Message(Logger::LOG_WARNING,ss.str());
-					}
-					byguid[guid] = instance;
+					register_scanned_guid_(*instance->data().getArgument(0), instance);
 				} catch (const IfcException& ex) {
 					Logger::Message(Logger::LOG_ERROR,ex.what());
 				}
 			}
 
-			const IfcParse::declaration* ty = &instance->declaration();
-
-			{
-				IfcEntityList::ptr insts = instances_by_type_excl_subtypes(ty);
-				if (!insts) {
-					insts = IfcEntityList::ptr(new IfcEntityList());
-					bytype_excl[ty] = insts;
-				}
-				insts->push(instance);
-			}
-
-			for (;;) {
-				IfcEntityList::ptr insts = instances_by_type(ty);
-				if (!insts) {
-					insts = IfcEntityList::ptr(new IfcEntityList());
-					bytype[ty] = insts;
-				}
-				insts->push(instance);
-				const IfcParse::declaration* pt = ty->as_entity()->supertype();
-				if (pt) {
-					ty = pt;
-				} else {
-					break;
-				}
-			}
-
-			if (byid.find(current_id) != byid.end()) {
-				std::stringstream ss;
-				ss << "Overwriting instance with name #" << current_id;
-				Logger::Message(Logger::LOG_WARNING,ss.str());
-			}
-			byid[current_id] = instance;
-			
-			MaxId = (std::max)(MaxId, current_id);
+			register_scanned_instance_(current_id, instance);
 		} else if (token_stream[0].type == IfcParse::Token_IDENTIFIER && instance) {
 			register_inverse(current_id, token_stream[0]);
 		}
@@ -1490,8 +1494,232 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 	Logger::Status("\rDone scanning file   ");
 
 	parsing_complete_ = true;
+}
 
-	return;
+void IfcFile::register_scanned_guid_(const std::string& guid, IfcUtil::IfcBaseClass* instance) {
+	if ( byguid.find(guid) != byguid.end() ) {
+		std::stringstream ss;
+		ss << "Instance encountered with non-unique GlobalId " << guid;
+		Logger::Message(Logger::LOG_WARNING,ss.str());
+	}
+	byguid[guid] = instance;
+}
+
+void IfcFile::register_scanned_instance_(unsigned int current_id, IfcUtil::IfcBaseClass* instance) {
+	const IfcParse::declaration* ty = &instance->declaration();
+
+	{
+		IfcEntityList::ptr insts = instances_by_type_excl_subtypes(ty);
+		if (!insts) {
+			insts = IfcEntityList::ptr(new IfcEntityList());
+			bytype_excl[ty] = insts;
+		}
+		insts->push(instance);
+	}
+
+	for (;;) {
+		IfcEntityList::ptr insts = instances_by_type(ty);
+		if (!insts) {
+			insts = IfcEntityList::ptr(new IfcEntityList());
+			bytype[ty] = insts;
+		}
+		insts->push(instance);
+		const IfcParse::declaration* pt = ty->as_entity()->supertype();
+		if (pt) {
+			ty = pt;
+		} else {
+			break;
+		}
+	}
+
+	if (byid.find(current_id) != byid.end()) {
+		std::stringstream ss;
+		ss << "Overwriting instance with name #" << current_id;
+		Logger::Message(Logger::LOG_WARNING,ss.str());
+	}
+	byid[current_id] = instance;
+	
+	MaxId = (std::max)(MaxId, current_id);
+}
+
+namespace {
+	// Chunks smaller than this are not worth the overhead of a separate thread
+	static const unsigned int min_scan_chunk_size = 1 << 20;
+
+	struct scanned_chunk {
+		std::vector<std::pair<unsigned int, IfcUtil::IfcBaseClass*> > instances;
+		std::vector<std::pair<std::string, IfcUtil::IfcBaseClass*> > guids;
+		// Pairs of (referenced instance name, referencing instance name)
+		std::vector<std::pair<unsigned int, unsigned int> > references;
+	};
+
+	// Returns the first offset in [from, end) at which an entity instance name starts on a
+	// new line following the ';' that terminates the previous instance, or end if there is none.
+	unsigned int find_instance_boundary(IfcSpfStream* stream, unsigned int from, unsigned int end) {
+		for (unsigned int i = from; i < end; ++i) {
+			if (stream->Read(i) != '#') {
+				continue;
+			}
+			unsigned int j = i + 1;
+			while (j < end && isdigit(stream->Read(j))) ++j;
+			if (j == i + 1) {
+				continue;
+			}
+			while (j < end && (stream->Read(j) == ' ' || stream->Read(j) == '\t')) ++j;
+			if (j == end || stream->Read(j) != '=') {
+				continue;
+			}
+			unsigned int k = i;
+			bool newline = false;
+			while (k > from) {
+				const char c = stream->Read(--k);
+				if (c == '\n' || c == '\r') {
+					newline = true;
+				} else if (c != ' ' && c != '\t') {
+					break;
+				}
+			}
+			if (newline && stream->Read(k) == ';') {
+				return i;
+			}
+		}
+		return end;
+	}
+
+	// Same as the sequential scan in IfcFile::initialize_(), but rather than registering the instances
+	// in the file maps, they are collected so that the chunks can be merged in file order afterwards.
+	// GlobalIds are read directly from the token stream to not load instances from multiple threads.
+	void scan_chunk(IfcParse::IfcFile* file, IfcSpfStream* stream, scanned_chunk& result) {
+		IfcSpfLexer lexer(stream, file);
+		const IfcParse::declaration* ifcroot_type = file->schema()->declaration_by_name("IfcRoot");
+
+		boost::circular_buffer<Token> token_stream(3, Token());
+
+		IfcUtil::IfcBaseClass* instance = 0;
+		IfcUtil::IfcBaseClass* awaiting_guid = 0;
+		int tokens_since_keyword = 0;
+		unsigned current_id = 0;
+		int trailing_tokens = 0;
+
+		for (;;) {
+			if (awaiting_guid && ++tokens_since_keyword == 2) {
+				// The token following the opening parenthesis is the GlobalId
+				try {
+					result.guids.push_back(std::make_pair(TokenFunc::asString(token_stream[2]), awaiting_guid));
+				} catch (const IfcException& ex) {
+					Logger::Message(Logger::LOG_ERROR, ex.what());
+				}
+				awaiting_guid = 0;
+			}
+
+			if (token_stream[0].type == IfcParse::Token_IDENTIFIER &&
+				token_stream[1].type == IfcParse::Token_OPERATOR &&
+				token_stream[1].value_char == '=' &&
+				token_stream[2].type == IfcParse::Token_KEYWORD)
+			{
+				current_id = (unsigned) TokenFunc::asIdentifier(token_stream[0]);
+				const IfcParse::declaration* entity_type = 0;
+				try {
+					entity_type = file->schema()->declaration_by_name(TokenFunc::asStringRef(token_stream[2]));
+				} catch (const IfcException& ex) {
+					Logger::Message(Logger::LOG_ERROR, ex.what());
+				}
+
+				if (entity_type) {
+					IfcEntityInstanceData* data = new IfcEntityInstanceData(entity_type, file, current_id, token_stream[2].startPos);
+					instance = file->schema()->instantiate(data);
+					result.instances.push_back(std::make_pair(current_id, instance));
+
+					if (instance->declaration().is(*ifcroot_type)) {
+						awaiting_guid = instance;
+						tokens_since_keyword = 0;
+					}
+				}
+			} else if (token_stream[0].type == IfcParse::Token_IDENTIFIER && instance) {
+				result.references.push_back(std::make_pair((unsigned) token_stream[0].value_int, current_id));
+			}
+
+			Token next_token;
+			try {
+				next_token = lexer.Next();
+			} catch (const IfcException& e) {
+				Logger::Message(Logger::LOG_ERROR, std::string(e.what()) + ". Parsing terminated");
+				break;
+			} catch (...) {
+				Logger::Message(Logger::LOG_ERROR, "Parsing terminated");
+				break;
+			}
+
+			// Unlike the sequential scan, the end of a chunk is followed by instance data, so
+			// the window is shifted until the last token has been considered at its front.
+			if (next_token.type == Token_NONE && ++trailing_tokens == 3) break;
+
+			token_stream.push_back(next_token);
+		}
+	}
+}
+
+void IfcFile::scan_concurrently_(unsigned int data_offset, int num_threads) {
+	const unsigned int end = stream->size;
+	const unsigned int data_size = end > data_offset ? end - data_offset : 0;
+
+	unsigned int num_chunks = (std::min)((unsigned int) (std::max)(num_threads, 1), data_size / min_scan_chunk_size);
+	if (num_chunks < 2) {
+		// Fall back to the sequential scan
+		return;
+	}
+
+	std::vector<unsigned int> boundaries = { data_offset };
+	for (unsigned int i = 1; i < num_chunks; ++i) {
+		const unsigned int b = find_instance_boundary(stream, (std::max)(boundaries.back(), data_offset + (unsigned int) ((uint64_t) data_size * i / num_chunks)), end);
+		if (b != boundaries.back() && b != end) {
+			boundaries.push_back(b);
+		}
+	}
+	boundaries.push_back(end);
+	num_chunks = (unsigned int) boundaries.size() - 1;
+
+	Logger::Status("Scanning file using " + std::to_string(num_chunks) + " threads...");
+
+	std::vector<IfcSpfStream*> streams;
+	std::vector<scanned_chunk> chunks(num_chunks);
+	std::vector<std::thread> threads;
+	for (unsigned int i = 0; i < num_chunks; ++i) {
+		streams.push_back(new IfcSpfStream(stream, boundaries[i], boundaries[i + 1]));
+		threads.emplace_back(scan_chunk, this, streams.back(), std::ref(chunks[i]));
+	}
+	for (auto& t : threads) {
+		t.join();
+	}
+
+	size_t num_instances = 0, num_guids = 0;
+	for (auto& chunk : chunks) {
+		num_instances += chunk.instances.size();
+		num_guids += chunk.guids.size();
+	}
+	byid.reserve(num_instances);
+	byguid.reserve(num_guids);
+
+	// Merge in file order so that the resulting maps are identical to those of the sequential scan
+	for (auto& chunk : chunks) {
+		for (auto& p : chunk.instances) {
+			register_scanned_instance_(p.first, p.second);
+		}
+		for (auto& p : chunk.guids) {
+			register_scanned_guid_(p.first, p.second);
+		}
+		for (auto& p : chunk.references) {
+			byref[p.first].push_back(p.second);
+		}
+	}
+
+	for (auto& s : streams) {
+		delete s;
+	}
+
+	Logger::Status("\rDone scanning file   ");
+
+	parsing_complete_ = true;
 }
 
 class traversal_visitor {
@@ -1544,6 +1772,7 @@ IfcEntityList::ptr IfcFile::traverse(IfcUtil::IfcBaseClass* instance, int max_le
 void IfcFile::mark_entity_as_modified(int /*id*/)
 {
 	by_ref_cached_.clear();
+	++modification_count_;
 }
 
 void IfcFile::addEntities(IfcEntityList::ptr es) {
@@ -1557,6 +1786,8 @@ IfcUtil::IfcBaseClass* IfcFile::addEntity(IfcUtil::IfcBaseClass* entity) {
 		throw IfcParse::IfcException("Unabled to add instance from " + entity->declaration().schema()->name() + " schema to file with " + schema()->name() + " schema");
 	}
 
+	++modification_count_;
+
 	// If this instance has been inserted before, return
 	// a reference to the copy that was created from it.
 	entity_entity_map_t::iterator mit = entity_file_map.find(entity);
@@ -1771,6 +2002,8 @@ return new_entity;
 void IfcFile::removeEntity(IfcUtil::IfcBaseClass* entity) {
 	const unsigned id = entity->data().id();
 
+	++modification_count_;
+
 	IfcUtil::IfcBaseClass* file_entity = instance_by_id(id);
 
 	// Attention when running removeEntity inside a loop over a list of entities to be removed. 
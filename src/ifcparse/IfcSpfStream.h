@@ -49,6 +49,7 @@ namespace IfcParse {
 		const char* buffer;
 		unsigned int ptr;
 		unsigned int len;
+		bool owns_buffer = true;
 	public:
 		bool valid;
 		bool eof;
@@ -60,11 +61,17 @@ namespace IfcParse {
 #endif
 		IfcSpfStream(std::istream& f, int len);
 		IfcSpfStream(void* data, int len);
+		/// Creates a view on the range [begin, end) of the buffer of another stream, which
+		/// is not copied, so that parts of the file can be scanned concurrently. Offsets
+		/// remain relative to the start of the file.
+		IfcSpfStream(IfcSpfStream* parent, unsigned int begin, unsigned int end);
 		~IfcSpfStream();
 		/// Returns the character at the cursor 
 		char Peek();
 		/// Returns the character at specified offset
 		char Read(unsigned int offset);
+		/// Returns the buffer that holds the file contents
+		const char* Data();
 		/// Increment the file cursor and reads new page if necessary
 		void Inc();
 		void Close();
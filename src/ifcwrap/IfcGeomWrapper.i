@@ -37,6 +37,8 @@
 }
 
 %ignore IfcGeom::impl::tree::selector;
+// Wrapped as release_() below, so that the element is owned by Python
+%ignore IfcGeom::Iterator::release;
 
 %include "../ifcgeom/ifc_geom_api.h"
 %include "../ifcgeom/IfcGeomIteratorSettings.h"
@@ -233,9 +235,96 @@ struct ShapeRTTI : public boost::static_visitor<PyObject*>
 	static int mantissa_size() {
 		return std::numeric_limits<double>::digits;
 	}
+
+	// Returns the current element owned by Python, so that it remains valid when a streaming
+	// iterator advances. Used by ifcopenshell.geom.iterator.get() in streaming mode.
+	PyObject* release_() {
+		IfcGeom::Element<double>* elem = $self->release();
+		if (!elem) {
+			throw IfcParse::IfcException("The current element is not available for release");
+		}
+		return ShapeRTTI()(elem);
+	}
+
+	// Concatenates the triangulations of up to n elements, starting at the current element,
+	// into flat buffers and advances the iterator past them. Face, edge and material indices
+	// remain local to every element. The buffers are converted into NumPy arrays in
+	// ifcopenshell.geom.iterator.get_batch().
+	PyObject* get_batch_(int n) {
+		std::vector<int> ids, faces, edges, material_ids;
+		std::vector<double> verts, normals, matrices;
+		std::vector<int64_t> verts_offsets(1, 0), normals_offsets(1, 0), faces_offsets(1, 0), edges_offsets(1, 0), material_ids_offsets(1, 0);
+		std::vector<std::string> guids;
+		bool exhausted = false;
+
+		for (int i = 0; i < n; ++i) {
+			IfcGeom::Element<double>* current = $self->get();
+			if (!current) {
+				throw IfcParse::IfcException("The current element has already been released by get()");
+			}
+			IfcGeom::TriangulationElement<double>* elem = dynamic_cast<IfcGeom::TriangulationElement<double>*>(current);
+			if (!elem) {
+				throw IfcParse::IfcException("Batches are only available for triangulated elements");
+			}
+			const IfcGeom::Representation::Triangulation<double>& mesh = elem->geometry();
+
+			ids.push_back(elem->id());
+			guids.push_back(elem->guid());
+			const std::vector<double>& m = elem->transformation().matrix().data();
+			matrices.insert(matrices.end(), m.begin(), m.end());
+
+			verts.insert(verts.end(), mesh.verts().begin(), mesh.verts().end());
+			normals.insert(normals.end(), mesh.normals().begin(), mesh.normals().end());
+			faces.insert(faces.end(), mesh.faces().begin(), mesh.faces().end());
+			edges.insert(edges.end(), mesh.edges().begin(), mesh.edges().end());
+			material_ids.insert(material_ids.end(), mesh.material_ids().begin(), mesh.material_ids().end());
+
+			verts_offsets.push_back(verts.size());
+			normals_offsets.push_back(normals.size());
+			faces_offsets.push_back(faces.size());
+			edges_offsets.push_back(edges.size());
+			material_ids_offsets.push_back(material_ids.size());
+
+			if (!$self->next()) {
+				exhausted = true;
+				break;
+			}
+		}
+
+		PyObject* batch = PyDict_New();
+		const std::pair<const char*, PyObject*> items[] = {
+			{"ids", bytearray_from_vector(ids)},
+			{"guids", pythonize_vector(guids)},
+			{"matrices", bytearray_from_vector(matrices)},
+			{"verts", bytearray_from_vector(verts)},
+			{"normals", bytearray_from_vector(normals)},
+			{"faces", bytearray_from_vector(faces)},
+			{"edges", bytearray_from_vector(edges)},
+			{"material_ids", bytearray_from_vector(material_ids)},
+			{"verts_offsets", bytearray_from_vector(verts_offsets)},
+			{"normals_offsets", bytearray_from_vector(normals_offsets)},
+			{"faces_offsets", bytearray_from_vector(faces_offsets)},
+			{"edges_offsets", bytearray_from_vector(edges_offsets)},
+			{"material_ids_offsets", bytearray_from_vector(material_ids_offsets)},
+			{"exhausted", PyBool_FromLong(exhausted)}
+		};
+		for (auto& item : items) {
+			PyDict_SetItemString(batch, item.first, item.second);
+			Py_DECREF(item.second);
+		}
+		return batch;
+	}
 };
 
 %extend IfcGeom::Representation::Triangulation {
+	// Copies of the underlying vectors in a single memcpy each. A view on the vectors would
+	// not keep the element that owns them alive, so it could outlive the geometry.
+	PyObject* verts_buffer() const { return bytearray_from_vector($self->verts()); }
+	PyObject* normals_buffer() const { return bytearray_from_vector($self->normals()); }
+	PyObject* faces_buffer() const { return bytearray_from_vector($self->faces()); }
+	PyObject* edges_buffer() const { return bytearray_from_vector($self->edges()); }
+	PyObject* material_ids_buffer() const { return bytearray_from_vector($self->material_ids()); }
+
 	%pythoncode %{
         # Hide the getters with read-only property implementations
         id = property(id)
@@ -243,6 +332,11 @@ struct ShapeRTTI : public boost::static_visitor<PyObject*>
         edges = property(edges)
         material_ids = property(material_ids)
         materials = property(materials)
+        verts_buffer = property(verts_buffer)
+        normals_buffer = property(normals_buffer)
+        faces_buffer = property(faces_buffer)
+        edges_buffer = property(edges_buffer)
+        material_ids_buffer = property(material_ids_buffer)
 	%}
 };
 
@@ -226,6 +226,12 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return self->declaration().name();
 	}
 
+	// The declaration name prefixed by the schema name, which identifies the
+	// declaration across schemas so that it can be used as a key for caching.
+	std::string schema_declaration_name() const {
+		return self->declaration().schema()->name() + "." + self->declaration().name();
+	}
+
 	std::pair<IfcUtil::ArgumentType,Argument*> get_argument(unsigned i) {
 		return std::pair<IfcUtil::ArgumentType,Argument*>($self->data().getArgument(i)->type(), $self->data().getArgument(i));
 	}
@@ -526,11 +532,27 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 #endif
 
 %inline %{
-	IfcParse::IfcFile* open(const std::string& fn) {
-		IfcParse::IfcFile* f = new IfcParse::IfcFile(fn);
+	IfcParse::IfcFile* open(const std::string& fn, bool mmap = false, int num_threads = 1, const std::string& index_fn = "") {
+#ifdef USE_MMAP
+		IfcParse::IfcSpfStream* stream = new IfcParse::IfcSpfStream(fn, mmap);
+#else
+		if (mmap) {
+			throw IfcParse::IfcException("IfcOpenShell was built without support for memory-mapped files");
+		}
+		IfcParse::IfcSpfStream* stream = new IfcParse::IfcSpfStream(fn);
+#endif
+		IfcParse::IfcFile* f = new IfcParse::IfcFile(stream, num_threads, index_fn);
 		return f;
 	}
 
+	bool has_mmap() {
+#ifdef USE_MMAP
+		return true;
+#else
+		return false;
+#endif
+	}
+
 #ifdef WITH_IFCXML
 	IfcParse::IfcFile* parse_ifcxml(const std::string& fn) {
 		return IfcParse::parse_ifcxml(fn);
@@ -686,7 +708,7 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 
 	// @todo refactor this to remove duplication with the typemap. 
 	// except this is calls the above function in case of instances.
-	PyObject* convert_cpp_attribute_to_python(IfcUtil::ArgumentType type, Argument& arg) {
+	PyObject* convert_cpp_attribute_to_python(IfcUtil::ArgumentType type, Argument& arg, PyObject* (*instance_to_python)(IfcUtil::IfcBaseClass*) = get_info_cpp) {
 		if (!arg.isNull() && type != IfcUtil::Argument_DERIVED) {
 		try {
 		switch(type) {
@@ -725,13 +747,13 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 			break; }
 			case IfcUtil::Argument_ENTITY_INSTANCE: {
 				IfcUtil::IfcBaseClass* v = arg;
-				return get_info_cpp(v);
+				return instance_to_python(v);
 			break; }
 			case IfcUtil::Argument_AGGREGATE_OF_ENTITY_INSTANCE: {
 				IfcEntityList::ptr v = arg;
 				auto r = PyTuple_New(v->size());
 				for (unsigned i = 0; i < v->size(); ++i) {
-					PyTuple_SetItem(r, i, get_info_cpp((*v)[i]));
+					PyTuple_SetItem(r, i, instance_to_python((*v)[i]));
 				}				
 				return r;
 			break; }
@@ -751,10 +773,10 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 				IfcEntityListList::ptr vs = arg;
 				auto rs = PyTuple_New(vs->size());
 				for (auto it = vs->begin(); it != vs->end(); ++it) {
-					IfcEntityList::ptr v_i = arg;
-					auto r = PyTuple_New(v_i->size());
-					for (unsigned i = 0; i < v_i->size(); ++i) {
-						PyTuple_SetItem(r, i, get_info_cpp((*v_i)[i]));
+					const std::vector<IfcUtil::IfcBaseClass*>& v_i = *it;
+					auto r = PyTuple_New(v_i.size());
+					for (unsigned i = 0; i < v_i.size(); ++i) {
+						PyTuple_SetItem(r, i, instance_to_python(v_i[i]));
 					}
 					PyTuple_SetItem(rs, std::distance(vs->begin(), it), r);
 				}				
@@ -799,4 +821,97 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return d;
 	}
 %}
+%{
+	static PyObject* helper_fn_pythonize_instance(IfcUtil::IfcBaseClass* v) {
+		return pythonize(v);
+	}
+%}
+%inline %{
+	// Reads the attributes for a sequence of instances or instance names and returns a
+	// tuple with a list of values for every attribute. Attribute indices are resolved
+	// once per declaration. Instances without an attribute of that name yield None.
+	PyObject* get_attributes_cpp(IfcParse::IfcFile* f, PyObject* instances, const std::vector<std::string>& names) {
+		if (!PySequence_Check(instances)) {
+			throw IfcParse::IfcException("Expected a sequence of entity instances or instance names");
+		}
+
+		static const int attribute_missing = -1;
+		static const int attribute_inverse = -2;
+		std::map<const IfcParse::declaration*, std::vector<int> > indices;
 
+		const Py_ssize_t n = PySequence_Size(instances);
+		PyObject* columns = PyTuple_New(names.size());
+		for (size_t j = 0; j < names.size(); ++j) {
+			PyTuple_SetItem(columns, j, PyList_New(n));
+		}
+
+		try {
+			for (Py_ssize_t i = 0; i < n; ++i) {
+				PyObject* element = PySequence_GetItem(instances, i);
+				IfcUtil::IfcBaseClass* inst;
+				if (PyInt_Check(element)) {
+					inst = f->instance_by_id(PyInt_AsLong(element));
+				} else {
+					inst = cast_pyobject<IfcUtil::IfcBaseClass*>(element);
+				}
+				Py_DECREF(element);
+				if (!inst) {
+					throw IfcParse::IfcException("Expected a sequence of entity instances or instance names");
+				}
+
+				const IfcParse::declaration* decl = &inst->declaration();
+				auto it = indices.find(decl);
+				if (it == indices.end()) {
+					std::vector<int> decl_indices(names.size(), attribute_missing);
+					if (decl->as_entity()) {
+						const std::vector<const IfcParse::attribute*> attrs = decl->as_entity()->all_attributes();
+						const std::vector<const IfcParse::inverse_attribute*> inverse_attrs = decl->as_entity()->all_inverse_attributes();
+						for (size_t j = 0; j < names.size(); ++j) {
+							for (auto jt = attrs.begin(); jt != attrs.end(); ++jt) {
+								if ((*jt)->name() == names[j]) {
+									decl_indices[j] = (int) std::distance(attrs.begin(), jt);
+									break;
+								}
+							}
+							if (decl_indices[j] == attribute_missing) {
+								for (auto& attr : inverse_attrs) {
+									if (attr->name() == names[j]) {
+										decl_indices[j] = attribute_inverse;
+										break;
+									}
+								}
+							}
+						}
+					} else {
+						for (size_t j = 0; j < names.size(); ++j) {
+							if (names[j] == "wrappedValue") {
+								decl_indices[j] = 0;
+							}
+						}
+					}
+					it = indices.insert(std::make_pair(decl, decl_indices)).first;
+				}
+
+				for (size_t j = 0; j < names.size(); ++j) {
+					PyObject* value;
+					const int idx = it->second[j];
+					if (idx >= 0) {
+						Argument* arg = inst->data().getArgument(idx);
+						value = convert_cpp_attribute_to_python(arg->type(), *arg, helper_fn_pythonize_instance);
+					} else if (idx == attribute_inverse) {
+						value = pythonize(((IfcUtil::IfcBaseEntity*) inst)->get_inverse(names[j]));
+					} else {
+						Py_INCREF(Py_None);
+						value = Py_None;
+					}
+					PyList_SET_ITEM(PyTuple_GET_ITEM(columns, j), i, value);
+				}
+			}
+		} catch (...) {
+			Py_DECREF(columns);
+			throw;
+		}
+
+		return columns;
+	}
+%}
@@ -168,6 +168,12 @@
 		return pyobj;
 	}
 
+	// Copies the vector into a newly allocated, writable bytearray in a single memcpy
+	template <typename T>
+	PyObject* bytearray_from_vector(const std::vector<T>& v) {
+		return PyByteArray_FromStringAndSize(v.empty() ? "" : (const char*) v.data(), v.size() * sizeof(T));
+	}
+
 	PyObject* pythonize(const IfcEntityListList::ptr& t) {
 		unsigned int i = 0;
 		PyObject* pyobj = PyTuple_New(t->size());
@@ -19,12 +19,18 @@
 
 # Some basic tests. Currently only covering basic I/O.
 
+import itertools
+import json
 import os
+import struct
 import uuid
 
 import ifcopenshell
 import ifcopenshell.geom
 import ifcopenshell.guid
+import ifcopenshell.util.element
+import ifcopenshell.util.selector
+import ifcopenshell.validate
 
 f = ifcopenshell.open("input/acad2010_walls.ifc")
 
@@ -92,6 +98,141 @@ assert f[288].ConnectedTo == (rel,)
 # Some operations on ifcopenshell.guid
 assert len(ifcopenshell.guid.compress(uuid.uuid1().hex)) == 22
 
+# Batch GUID operations match their single GUID counterparts
+hex_guids = [uuid.uuid4().hex for i in range(100)] + ["0" * 32, "f" * 32]
+compressed = ifcopenshell.guid.compress_many(hex_guids)
+assert compressed == [ifcopenshell.guid.compress(g) for g in hex_guids]
+assert ifcopenshell.guid.expand_many(compressed) == [ifcopenshell.guid.expand(g) for g in compressed] == hex_guids
+assert ifcopenshell.guid.compress_many([bytes.fromhex(g) for g in hex_guids]) == compressed
+assert ifcopenshell.guid.compress_many(ifcopenshell.guid.to_bytes(hex_guids)) == compressed
+assert ifcopenshell.guid.to_bytes(hex_guids).shape == (102, 16)
+assert ifcopenshell.guid.to_bytes(hex_guids)[1].tobytes() == bytes.fromhex(hex_guids[1])
+assert ifcopenshell.guid.compress_many([]) == ifcopenshell.guid.expand_many([]) == []
+for g in ifcopenshell.guid.new_many(100):
+    u = uuid.UUID(ifcopenshell.guid.expand(g))
+    assert u.version == 4 and u.variant == uuid.RFC_4122
+for invalid in (["0" * 21], ["0" * 21 + "-"], ["4" + "0" * 21]):
+    try:
+        ifcopenshell.guid.expand_many(invalid)
+        assert False
+    except ValueError:
+        pass
+
+# The property set index reflects changes to the file
+g = ifcopenshell.file(schema="IFC2X3")
+wall = g.createIfcWall(ifcopenshell.guid.new())
+prop = g.createIfcPropertySingleValue("Color", None, g.createIfcLabel("Red"), None)
+pset = g.createIfcPropertySet(ifcopenshell.guid.new(), None, "Pset_Custom", None, (prop,))
+rel = g.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), None, None, None, (wall,), pset)
+assert ifcopenshell.util.element.get_psets(wall, g) == {"Pset_Custom": {"Color": "Red"}}
+pset.HasProperties = pset.HasProperties + (g.createIfcPropertySingleValue("Size", None, g.createIfcLabel("L"), None),)
+assert ifcopenshell.util.element.get_psets(wall, g) == {"Pset_Custom": {"Color": "Red", "Size": "L"}}
+prop.NominalValue = g.createIfcLabel("Blue")
+assert ifcopenshell.util.element.get_psets(wall, g) == {"Pset_Custom": {"Color": "Blue", "Size": "L"}}
+assert ifcopenshell.util.element.get_psets(wall, g) == ifcopenshell.util.element.get_psets(wall)
+g.remove(rel)
+assert ifcopenshell.util.element.get_psets(wall, g) == {}
+
+# Streamed selector results match parsed results, including their order
+g = ifcopenshell.file(schema="IFC2X3")
+for i in range(600):
+    g.createIfcWall(ifcopenshell.guid.new(), None, "ABC"[i % 3])
+    if i % 2:
+        g.createIfcSlab(ifcopenshell.guid.new(), None, "ABC"[i % 5 % 3])
+selector = ifcopenshell.util.selector.Selector()
+for query in (
+    ".IfcWall",
+    '.IfcWall[Name="A"]',
+    '.IfcSlab | .IfcWall[Name="B"] | .IfcElement[Name="B"]',
+    '.IfcElement[Name="A"] & .IfcSlab | .IfcWall[Name="C"]',
+    '(.IfcSlab | .IfcWall) & (.IfcElement[Name="A"] | .IfcElement[Name="C"])',
+):
+    results = list(selector.iter(g, query))
+    assert results == selector.parse(g, query)
+    assert len(set(results)) == len(results)
+
+
+class counting_selector(ifcopenshell.util.selector.Selector):
+    num_values = 0
+
+    def get_element_values(self, elements, key):
+        self.num_values += len(elements)
+        return super(counting_selector, self).get_element_values(elements, key)
+
+
+# Elements are filtered lazily, so taking the first results stops early
+selector = counting_selector()
+first = list(itertools.islice(selector.iter(g, '.IfcWall[Name="B"]'), 2))
+assert 0 < selector.num_values < 600
+assert first == selector.parse(g, '.IfcWall[Name="B"]')[:2]
+
+# The compiled attribute checkers agree with assert_valid()
+h = ifcopenshell.file(schema="IFC4")
+schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name("IFC4")
+
+
+def get_attribute_type(entity, name):
+    declaration = schema.declaration_by_name(entity)
+    return next(a for a in declaration.all_attributes() if a.name() == name).type_of_attribute()
+
+
+def compiled_valid(attr_type, val):
+    try:
+        return ifcopenshell.validate.compile_checker(attr_type, schema)(val)
+    except ifcopenshell.validate.ValidationError:
+        return False
+
+
+point = h.createIfcCartesianPoint((0.0, 0.0, 0.0))
+wall = h.createIfcWall(ifcopenshell.guid.new())
+cases = [
+    # Selects, including nested selects and type declarations
+    ("IfcPropertySingleValue", "NominalValue", h.createIfcLabel("A"), True),
+    ("IfcPropertySingleValue", "NominalValue", h.createIfcLengthMeasure(1.0), True),
+    ("IfcPropertySingleValue", "NominalValue", point, False),
+    ("IfcRelAssociatesMaterial", "RelatingMaterial", h.createIfcMaterial("Concrete"), True),
+    ("IfcRelAssociatesMaterial", "RelatingMaterial", point, False),
+    # Entities
+    ("IfcRelDefinesByProperties", "RelatedObjects", (wall,), True),
+    ("IfcRelDefinesByProperties", "RelatedObjects", (point,), False),
+    # Bounds
+    ("IfcCartesianPoint", "Coordinates", (0.0,), True),
+    ("IfcCartesianPoint", "Coordinates", (), False),
+    ("IfcCartesianPoint", "Coordinates", (0.0, 0.0, 0.0, 0.0), False),
+    ("IfcCartesianPoint", "Coordinates", (0,), False),
+    # Nested aggregates
+    ("IfcCartesianPointList3D", "CoordList", ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0)), True),
+    ("IfcCartesianPointList3D", "CoordList", ((0.0, 0.0, 0.0), (1.0, 0.0)), False),
+    ("IfcCartesianPointList3D", "CoordList", ((0.0, 0.0, "0"),), False),
+    ("IfcCartesianPointList3D", "CoordList", (), False),
+    # Enumerations
+    ("IfcWall", "PredefinedType", "SOLIDWALL", True),
+    ("IfcWall", "PredefinedType", "SOLID", False),
+]
+for entity, name, val, valid in cases:
+    attr_type = get_attribute_type(entity, name)
+    assert ifcopenshell.validate.try_valid(attr_type, val, schema) == valid
+    assert compiled_valid(attr_type, val) == valid
+for inst in h:
+    entity, is_abstract, attributes, inverse_attributes = ifcopenshell.validate.compile_entity(schema, inst.is_a())
+    for (attr, is_optional, check), val in zip(attributes, inst):
+        if val is not None:
+            assert ifcopenshell.validate.try_valid(attr, val, schema) == compiled_valid(attr.type_of_attribute(), val)
+
+# Statements of revalidated instances do not refer to removed instances
+h = ifcopenshell.file(schema="IFC2X3")
+tracker = h.track_changes()
+wall = h.createIfcWall()
+statements = ifcopenshell.validate.validate_changes(h, tracker)
+assert statements and all(isinstance(s["instance"], str) for s in statements)
+assert all(ifcopenshell.validate.get_statement_instance_id(s) == wall.id() for s in statements)
+wall.GlobalId = ifcopenshell.guid.new()
+edited = ifcopenshell.validate.validate_changes(h, tracker, json.loads(json.dumps(statements)))
+assert len(edited) == len(statements) - 1
+h.remove(wall)
+assert ifcopenshell.validate.validate_changes(h, tracker, edited) == []
+tracker.close()
+
 # Test the BVH tree
 tree_settings = ifcopenshell.geom.settings()
 tree_settings.set(tree_settings.DISABLE_OPENING_SUBTRACTIONS, True)
@@ -99,6 +240,26 @@ t = ifcopenshell.geom.tree(f, tree_settings)
 # This wall is connected to two other walls
 assert len(t.select_box(f[48], extend=0.1)) == 3
 
+# Streamed elements remain valid after the iterator advances past them
+geom_settings = ifcopenshell.geom.settings()
+buffered = [(s.id, s.geometry.verts) for s in ifcopenshell.geom.iterator(geom_settings, f, 2)]
+streamed = list(ifcopenshell.geom.iterator(geom_settings, f, 2, max_in_flight=2))
+assert [(s.id, s.geometry.verts) for s in streamed] == buffered
+unordered = ifcopenshell.geom.iterator(geom_settings, f, 2, max_in_flight=2, deterministic_order=False)
+assert sorted(s.id for s in unordered) == sorted(i for i, _ in buffered)
+
+# Geometry buffers are copies that outlive the shape
+shape = ifcopenshell.geom.create_shape(geom_settings, f[48])
+verts = shape.geometry.verts
+verts_buffer = shape.geometry.verts_buffer
+del shape
+assert struct.unpack("%dd" % len(verts), verts_buffer) == verts
+try:
+    ifcopenshell.geom.iterator(geom_settings, f).get_batch(0)
+    assert False
+except ValueError:
+    pass
+
 # Test serialization
 f.write("output.ifc")
 with open("output.ifc") as txt: